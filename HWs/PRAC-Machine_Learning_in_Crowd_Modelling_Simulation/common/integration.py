@@ -0,0 +1,268 @@
+import numpy as np
+
+# Dormand-Prince coefficients: stage matrix, 5th order weights, error weights and dense output polynomial. The nodes
+# are not needed since the ODE is autonomous
+DP_A = np.array([
+    [0, 0, 0, 0, 0],
+    [1 / 5, 0, 0, 0, 0],
+    [3 / 40, 9 / 40, 0, 0, 0],
+    [44 / 45, -56 / 15, 32 / 9, 0, 0],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729, 0],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656]
+])
+DP_B = np.array([35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84])
+DP_E = np.array([-71 / 57600, 0, 71 / 16695, -71 / 1920, 17253 / 339200, -22 / 525, 1 / 40])
+DP_P = np.array([
+    [1, -8048581381 / 2820520608, 8663915743 / 2820520608, -12715105075 / 11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200 / 32700410799, -68118460800 / 10900136933, 87487479700 / 32700410799],
+    [0, -1754552775 / 470086768, 14199869525 / 1410260304, -10690763975 / 1880347072],
+    [0, 127303824393 / 49829197408, -318862633887 / 49829197408, 701980252875 / 199316789632],
+    [0, -282668133 / 205662961, 2019193451 / 616988883, -1453857185 / 822651844],
+    [0, 40617522 / 29380423, -110615467 / 29380423, 69997945 / 29380423]
+])
+
+FIXED_STEP_METHODS = ('euler', 'rk4', 'implicit_euler')
+
+
+def integrate(f_ode, y0, time, method='rk4', out=None, **options):
+    """
+    Solves the given ODE system d/dt x = f_ode(x(t)) at the given time values. A batch of initial conditions is solved
+    together if y0 has more than one dimension, then f_ode must accept and return arrays of the shape of y0, e.g.
+    (n, d) for n initial conditions of a d dimensional system
+    :param f_ode:       the right hand side of the ordinary differential equation d/dt x = f_ode(x(t)).
+    :param y0:          the initial condition(s) to start the solution at, of shape (d,) or (n, d).
+    :param time:        np.array of increasing or decreasing time values, where the solution must be obtained.
+    :param method:      'euler', 'rk4' or 'implicit_euler' taking one step between consecutive time values, or 'rk45'
+                        taking adaptive Dormand-Prince steps and evaluating the dense output at the time values
+    :param out:         preallocated array of shape (len(time),) + y0.shape to write the solution into
+    :param options:     options of the method, see solve_implicit_euler and solve_rk45
+    :returns:           the solution of shape (len(time),) + y0.shape, out if given
+    """
+    if method == 'rk45':
+        return solve_rk45(f_ode, y0, time, out=out, **options)
+    if method not in FIXED_STEP_METHODS:
+        raise ValueError('Unknown integration method: {}'.format(method))
+    if method == 'implicit_euler':
+        return solve_implicit_euler(f_ode, y0, time, out=out, **options)
+    yt = _allocate_solution(y0, time, out)
+    step = _euler_step if method == 'euler' else _rk4_step
+    for k in range(1, len(time)):
+        yt[k] = step(f_ode, yt[k - 1], time[k] - time[k - 1])
+    return yt
+
+
+def _euler_step(f_ode, y, h):
+    return y + h * f_ode(y)
+
+
+def _rk4_step(f_ode, y, h):
+    k1 = f_ode(y)
+    k2 = f_ode(y + h / 2 * k1)
+    k3 = f_ode(y + h / 2 * k2)
+    k4 = f_ode(y + h * k3)
+    return y + h / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+
+def solve_implicit_euler(f_ode, y0, time, out=None, newton_tol=1e-10, max_newton_iter=20, jacobian_step=1e-7):
+    """
+    Solves the given ODE system by the implicit (backward) Euler method, which stays stable on stiff systems with large
+    steps. The implicit equation y_k = y_(k-1) + h * f_ode(y_k) is solved by Newton's method, with the Jacobian of
+    f_ode approximated by finite differences once per step
+    :param f_ode:           the right hand side of the ordinary differential equation d/dt x = f_ode(x(t)).
+    :param y0:              the initial condition(s) to start the solution at, of shape (d,) or (n, d).
+    :param time:            np.array of increasing or decreasing time values, where the solution must be obtained.
+    :param out:             preallocated array of shape (len(time),) + y0.shape to write the solution into
+    :param newton_tol:      the Newton iterations stop when the largest update is smaller than newton_tol
+    :param max_newton_iter: the maximum number of Newton iterations per step
+    :param jacobian_step:   the relative step of the finite differences
+    :returns:               the solution of shape (len(time),) + y0.shape, out if given
+    """
+    yt = _allocate_solution(y0, time, out)
+    shape = yt.shape[1:]
+    dim = shape[-1]
+    identity = np.eye(dim)
+    for k in range(1, len(time)):
+        h = time[k] - time[k - 1]
+        y_prev = yt[k - 1].reshape(-1, dim)
+        f_prev = f_ode(yt[k - 1]).reshape(-1, dim)
+        # the Jacobian of f_ode at the previous point, one column per coordinate, for each initial condition
+        jacobian = np.empty((y_prev.shape[0], dim, dim))
+        for j in range(dim):
+            delta = jacobian_step * np.maximum(1, np.abs(y_prev[:, j]))
+            y_shifted = y_prev.copy()
+            y_shifted[:, j] += delta
+            jacobian[:, :, j] = (f_ode(y_shifted.reshape(shape)).reshape(-1, dim) - f_prev) / delta[:, None]
+        newton_matrix = identity - h * jacobian
+
+        # the explicit Euler step is the initial guess
+        y = y_prev + h * f_prev
+        for _ in range(max_newton_iter):
+            residual = y - y_prev - h * f_ode(y.reshape(shape)).reshape(-1, dim)
+            update = np.linalg.solve(newton_matrix, residual[:, :, None])[:, :, 0]
+            y -= update
+            if np.max(np.abs(update)) < newton_tol:
+                break
+        yt[k] = y.reshape(shape)
+    return yt
+
+
+class DenseOutput:
+    """
+    Class for the continuous solution of the Dormand-Prince method, which is a 4th order polynomial in each step
+    Attributes:
+        shape:          The shape of the solution at a time value
+        t_steps:        The time values of the accepted steps, the first one is the start time
+        y_steps:        The flattened solution at the start of each step
+        h_steps:        The sizes of the steps
+        q_steps:        The coefficients of the polynomial of each step
+        direction:      1 if the solution is integrated forward in time, -1 if backward, in which case the steps are
+                        stored in the negated time
+    """
+
+    def __init__(self, shape, t_steps, y_steps, h_steps, q_steps, direction=1):
+        """
+        Initializer of the class DenseOutput
+        :param shape:       The shape of the solution at a time value
+        :param t_steps:     The time values of the accepted steps, the first one is the start time
+        :param y_steps:     The flattened solution at the start of each step
+        :param h_steps:     The sizes of the steps
+        :param q_steps:     The coefficients of the polynomial of each step
+        :param direction:   1 if the solution is integrated forward in time, -1 if backward
+        """
+        self.shape = shape
+        self.t_steps = np.asarray(t_steps)
+        self.y_steps = np.asarray(y_steps)
+        self.h_steps = np.asarray(h_steps)
+        self.q_steps = np.asarray(q_steps)
+        self.direction = direction
+
+    def __call__(self, time):
+        """
+        Evaluates the solution at the given time values between the start and the end time
+        :param time:    np.array of time values
+        :returns:       the solution of shape (len(time),) + y0.shape
+        """
+        time = self.direction * np.asarray(time, dtype=np.float64)
+        steps = np.clip(np.searchsorted(self.t_steps, time, side='right') - 1, 0, len(self.h_steps) - 1)
+        x = (time - self.t_steps[steps]) / self.h_steps[steps]
+        polynomial = np.einsum('ij,ijk->ik', _get_powers(x), self.q_steps[steps])
+        yt = self.y_steps[steps] + self.h_steps[steps, None] * polynomial
+        return yt.reshape((len(time),) + self.shape)
+
+
+def solve_rk45(f_ode, y0, time, out=None, rtol=1e-6, atol=1e-9, first_step=None, max_step=np.inf,
+               dense_output=False):
+    """
+    Solves the given ODE system by the adaptive Dormand-Prince method RK5(4) from the first to the last time value. The
+    step size is chosen so that the estimated local error stays below atol + rtol * |y|, and the solution at the time
+    values is evaluated by the dense output, so the number of steps does not depend on the number of time values. A
+    batch of initial conditions takes common steps, limited by the largest error
+    :param f_ode:           the right hand side of the ordinary differential equation d/dt x = f_ode(x(t)).
+    :param y0:              the initial condition(s) to start the solution at, of shape (d,) or (n, d).
+    :param time:            np.array of increasing or decreasing time values, where the solution must be obtained.
+    :param out:             preallocated array of shape (len(time),) + y0.shape to write the solution into
+    :param rtol:            relative tolerance of the local error
+    :param atol:            absolute tolerance of the local error
+    :param first_step:      size of the first step, estimated from f_ode if None
+    :param max_step:        maximum size of the steps
+    :param dense_output:    if True, the DenseOutput evaluating the solution at any time is returned as well
+    :returns:               the solution of shape (len(time),) + y0.shape, out if given, and the DenseOutput if
+                            dense_output
+    """
+    time = np.asarray(time, dtype=np.float64)
+    time_steps = np.diff(time)
+    if not (np.all(time_steps > 0) or np.all(time_steps < 0)):
+        raise ValueError('The time values must be strictly increasing or strictly decreasing')
+    if len(time) > 1 and time[-1] < time[0]:
+        # the ODE is autonomous, so going backward in time is solving d/dt x = -f_ode(x(t)) forward in the negated time
+        solution = solve_rk45(lambda y: -f_ode(y), y0, -time, out, rtol, atol, first_step, max_step, dense_output)
+        if dense_output:
+            solution[1].direction = -1
+        return solution
+
+    yt = _allocate_solution(y0, time, out)
+    shape = yt.shape[1:]
+    dim = shape[-1]
+    # the stages are stored flattened, so that they are combined by matrix products for any batch shape
+    flat_yt = yt.reshape(len(time), -1)
+    t_end = time[-1]
+    t = time[0]
+    y = flat_yt[0].copy()
+    f = f_ode(yt[0]).ravel()
+    h = _get_first_step(f_ode, yt[0], f.reshape(shape), rtol, atol) if first_step is None else first_step
+    k = np.empty((7, y.size))
+    t_steps, y_steps, h_steps, q_steps = [t], [], [], []
+    next_time_id = 1
+    while t < t_end:
+        h = min(h, max_step)
+        if h < 10 * np.finfo(float).eps * abs(t):
+            raise RuntimeError('The step size became too small at time {}'.format(t))
+        # the last step ends exactly at the end time
+        is_last_step = h >= t_end - t
+        if is_last_step:
+            h = t_end - t
+        k[0] = f
+        for stage in range(1, 6):
+            k[stage] = f_ode((y + h * np.dot(DP_A[stage, :stage], k[:stage])).reshape(shape)).ravel()
+        y_new = y + h * np.dot(DP_B, k[:6])
+        f_new = f_ode(y_new.reshape(shape)).ravel()
+        k[6] = f_new
+
+        scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+        error = h * np.dot(DP_E, k) / scale
+        error_norm = np.max(np.sqrt(np.mean((error ** 2).reshape(-1, dim), axis=1)))
+        if error_norm > 1:
+            h *= max(.2, .9 * error_norm ** -.2)
+            continue
+
+        q = np.dot(DP_P.T, k)
+        t_new = t_end if is_last_step else t + h
+        # evaluate the dense output at the time values inside the step
+        last_time_id = np.searchsorted(time, t_new, side='right')
+        if last_time_id > next_time_id:
+            x = (time[next_time_id:last_time_id] - t) / h
+            flat_yt[next_time_id:last_time_id] = y + h * np.dot(_get_powers(x), q)
+            next_time_id = last_time_id
+        if dense_output:
+            t_steps.append(t_new)
+            y_steps.append(y)
+            h_steps.append(h)
+            q_steps.append(q)
+
+        t, y, f = t_new, y_new, f_new
+        h *= 10 if error_norm == 0 else min(10, .9 * error_norm ** -.2)
+    flat_yt[next_time_id:] = y
+    if dense_output:
+        return yt, DenseOutput(shape, t_steps, y_steps, h_steps, q_steps)
+    return yt
+
+
+def _get_powers(x):
+    # the powers x, x^2, x^3, x^4 of the dense output polynomial, one row for each value
+    return np.cumprod(np.repeat(x[:, None], 4, axis=1), axis=1)
+
+
+def _get_first_step(f_ode, y0, f0, rtol, atol):
+    # the step making the change of y0 about 1% of its scale, corrected by the change of f_ode after the step
+    scale = atol + rtol * np.abs(y0)
+    d0 = np.sqrt(np.mean((y0 / scale) ** 2))
+    d1 = np.sqrt(np.mean((f0 / scale) ** 2))
+    h0 = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else .01 * d0 / d1
+    f1 = f_ode(y0 + h0 * f0)
+    d2 = np.sqrt(np.mean(((f1 - f0) / scale) ** 2)) / h0
+    if max(d1, d2) <= 1e-15:
+        h1 = max(1e-6, h0 * 1e-3)
+    else:
+        h1 = (.01 / max(d1, d2)) ** .2
+    return min(100 * h0, h1)
+
+
+def _allocate_solution(y0, time, out):
+    y0 = np.asarray(y0, dtype=np.float64)
+    if out is None:
+        out = np.empty((len(time),) + y0.shape, dtype=np.float64)
+    elif out.shape != (len(time),) + y0.shape or not out.flags.c_contiguous:
+        raise ValueError('The output array must be C contiguous with the shape {}'.format((len(time),) + y0.shape))
+    out[0] = y0
+    return out
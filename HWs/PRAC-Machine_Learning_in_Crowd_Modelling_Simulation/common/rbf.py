@@ -0,0 +1,138 @@
+import numpy as np
+from scipy.spatial.distance import cdist
+
+# the smallest exponent of the radial functions, exp(MIN_EXPONENT) is about 1e-304
+MIN_EXPONENT = -700
+
+
+def get_rbf_basis(x, x_l, eps, chunk_size=1024):
+    """
+    Calculates the Gaussian radial function values exp(-||x_l - x||^2 / eps^2) of the given points for all center
+    points. The points are processed chunk by chunk, so that the memory used besides the result is bounded
+    :param x:           The coordinates of the points, of shape (n,) for one dimensional points or (n, d)
+    :param x_l:         The center points, of shape (L,) for one dimensional points or (L, d)
+    :param eps:         The epsilon value given in the calculation of radial functions
+    :param chunk_size:  The number of points processed at once
+    :returns:           The radial function values of shape (n, L)
+    """
+    x = as_points(x)
+    x_l = as_points(x_l)
+    x_basis = np.empty([x.shape[0], x_l.shape[0]], dtype=np.float64)
+    for start in range(0, x.shape[0], chunk_size):
+        end = min(start + chunk_size, x.shape[0])
+        x_basis_chunk = x_basis[start:end]
+        # the squared distances are summed from the coordinate differences, which keeps them accurate for close points
+        # even when the coordinates are large compared with eps
+        cdist(x[start:end], x_l, 'sqeuclidean', out=x_basis_chunk)
+        x_basis_chunk *= -1 / eps ** 2
+        # the values of far points are negligible while exp is much slower when its result underflows
+        np.maximum(x_basis_chunk, MIN_EXPONENT, out=x_basis_chunk)
+        np.exp(x_basis_chunk, out=x_basis_chunk)
+    return x_basis
+
+
+def evaluate_rbf(x, x_l, eps, coef, chunk_size=1024):
+    """
+    Calculates the linear combination of the radial functions at the given points chunk by chunk, without storing the
+    radial function values of all points
+    :param x:           The coordinates of the points, of shape (n,) for one dimensional points or (n, d)
+    :param x_l:         The center points, of shape (L,) for one dimensional points or (L, d)
+    :param eps:         The epsilon value given in the calculation of radial functions
+    :param coef:        The matrix to transform radial functions to coordinates, of shape (L,) or (L, k)
+    :param chunk_size:  The number of points processed at once
+    :returns:           The values of the function at the points, of shape (n,) or (n, k) like coef
+    """
+    x = as_points(x)
+    coef = np.asarray(coef, dtype=np.float64)
+    y = np.empty((x.shape[0],) + coef.shape[1:], dtype=np.float64)
+    for start in range(0, x.shape[0], chunk_size):
+        end = min(start + chunk_size, x.shape[0])
+        y[start:end] = np.dot(get_rbf_basis(x[start:end], x_l, eps, chunk_size), coef)
+    return y
+
+
+def get_nearest_centers(x, x_l, chunk_size=1024):
+    """
+    Finds the nearest center point of each point chunk by chunk
+    :param x:           The coordinates of the points, of shape (n,) for one dimensional points or (n, d)
+    :param x_l:         The center points, of shape (L,) for one dimensional points or (L, d)
+    :param chunk_size:  The number of points processed at once
+    :returns:           The indices of the nearest center points of shape (n,)
+    """
+    x = as_points(x)
+    x_l = as_points(x_l)
+    nearest_centers = np.empty(x.shape[0], dtype=np.int64)
+    for start in range(0, x.shape[0], chunk_size):
+        end = min(start + chunk_size, x.shape[0])
+        nearest_centers[start:end] = np.argmin(cdist(x[start:end], x_l, 'sqeuclidean'), axis=1)
+    return nearest_centers
+
+
+def get_farthest_point_centers(x, L, rng):
+    """
+    Chooses center points among the points by farthest point sampling: starting from a random point, the point farthest
+    from the chosen ones is chosen next, so that the center points cover the data evenly
+    :param x:     The coordinates of the points, of shape (n,) for one dimensional points or (n, d)
+    :param L:     The number of center points
+    :param rng:   The random number generator choosing the first center point
+    :returns:     The center points of shape (L, d)
+    """
+    x = as_points(x)
+    center_ids = np.empty(L, dtype=np.int64)
+    center_ids[0] = rng.integers(x.shape[0])
+    squared_dist = np.sum((x - x[center_ids[0]]) ** 2, axis=1)
+    for k in range(1, L):
+        center_ids[k] = np.argmax(squared_dist)
+        np.minimum(squared_dist, np.sum((x - x[center_ids[k]]) ** 2, axis=1), out=squared_dist)
+    return x[center_ids]
+
+
+def get_kmeans_centers(x, L, rng, n_iter=20, chunk_size=1024):
+    """
+    Chooses center points by k-means clustering of the points, initialized by k-means++, so that the center points are
+    placed where the data is dense
+    :param x:           The coordinates of the points, of shape (n,) for one dimensional points or (n, d)
+    :param L:           The number of center points
+    :param rng:         The random number generator of the k-means++ initialization
+    :param n_iter:      The maximum number of k-means iterations
+    :param chunk_size:  The number of points processed at once
+    :returns:           The center points of shape (L, d)
+    """
+    x = as_points(x)
+    # k-means++ chooses the next center point with probability proportional to the squared distance to the chosen ones
+    x_l = np.empty([L, x.shape[1]], dtype=np.float64)
+    x_l[0] = x[rng.integers(x.shape[0])]
+    squared_dist = np.sum((x - x_l[0]) ** 2, axis=1)
+    for k in range(1, L):
+        total = squared_dist.sum()
+        if total > 0:
+            x_l[k] = x[rng.choice(x.shape[0], p=squared_dist / total)]
+        else:
+            x_l[k] = x[rng.integers(x.shape[0])]
+        np.minimum(squared_dist, np.sum((x - x_l[k]) ** 2, axis=1), out=squared_dist)
+
+    for _ in range(n_iter):
+        nearest_centers = get_nearest_centers(x, x_l, chunk_size)
+        counts = np.bincount(nearest_centers, minlength=L)
+        sums = np.stack([np.bincount(nearest_centers, weights=x[:, d], minlength=L) for d in range(x.shape[1])],
+                        axis=1)
+        # center points without any point are kept
+        new_x_l = x_l.copy()
+        is_nonempty = counts > 0
+        new_x_l[is_nonempty] = sums[is_nonempty] / counts[is_nonempty, None]
+        if np.allclose(new_x_l, x_l):
+            break
+        x_l = new_x_l
+    return x_l
+
+
+def as_points(x):
+    """
+    Converts the coordinates of one dimensional points to a column, so that points of any dimension are handled alike
+    :param x:   The coordinates of the points, of shape (n,) or (n, d)
+    :returns:   The coordinates of the points of shape (n, d)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if x.ndim == 1:
+        return x[:, None]
+    return x
@@ -0,0 +1,111 @@
+import argparse
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from engine import SimulationEngine
+
+# names of the columns storing the events of the pedestrians, one row per arrival or stuck event. The scenario of an
+# event is given by its row id in the scenario columns
+EVENT_COLUMNS = ['scenario_id', 'pedestrian_id', 'event', 'time', 'x', 'y', 'target_id']
+# names of the columns storing the summary of the scenarios, one row per scenario
+SCENARIO_COLUMNS = ['scenario_file', 'scenario_n_pedestrian', 'scenario_n_step', 'scenario_end_timestamp']
+
+
+def find_scenarios(paths: list):
+    """
+    Finds the scenario files given by directories (searched recursively), glob patterns or file paths
+    :param paths:   Directories, glob patterns or paths of the scenario files
+    :return:        Sorted paths of the scenario files without duplicates
+    """
+    file_paths = set()
+    for path in paths:
+        if os.path.isdir(path):
+            file_paths.update(glob.glob(os.path.join(path, '**', '*.json'), recursive=True))
+        else:
+            file_paths.update(file_path for file_path in glob.glob(path, recursive=True) if os.path.isfile(file_path))
+    return sorted(file_paths)
+
+
+def run_scenario(file_path: str, max_steps: int = None):
+    """
+    Runs a scenario headless and collects the events of its pedestrians
+    :param file_path:   Path to the scenario file in the format of `pygame_configuration.json`
+    :param max_steps:   Upper bound for the number of steps, STEP_LIMIT of the scenario if None
+    :return:            Dictionary of the event columns (except scenario_id) and dictionary of the scenario columns
+    """
+    engine = SimulationEngine.from_file(file_path)
+    n_step, end_timestamp = engine.run(max_steps)
+
+    arrived_ids = np.flatnonzero(engine.has_arrived)
+    stuck_ids = np.flatnonzero(engine.has_stuck)
+    pedestrian_ids = np.concatenate([arrived_ids, stuck_ids])
+    # the pedestrians are numbered from 1 as in the messages of Controller
+    events = {
+        'pedestrian_id': pedestrian_ids.astype(np.int32) + 1,
+        'event': np.array(['arrived'] * len(arrived_ids) + ['stuck'] * len(stuck_ids)),
+        'time': np.concatenate([engine.arrival_times[arrived_ids], engine.stuck_times[stuck_ids]]),
+        'x': engine.positions[pedestrian_ids, 0].astype(np.int32),
+        'y': engine.positions[pedestrian_ids, 1].astype(np.int32),
+        'target_id': np.concatenate([engine.arrival_targets[arrived_ids],
+                                     np.full(len(stuck_ids), -1, dtype=np.int32)]),
+    }
+    order = np.lexsort((events['pedestrian_id'], events['time']))
+    events = {column: values[order] for column, values in events.items()}
+    scenario = {
+        'scenario_file': np.array([file_path]),
+        'scenario_n_pedestrian': np.array([engine.n_pedestrian], dtype=np.int32),
+        'scenario_n_step': np.array([n_step], dtype=np.int64),
+        'scenario_end_timestamp': np.array([end_timestamp]),
+    }
+    return events, scenario
+
+
+def run_scenarios(file_paths: list, max_workers: int = None, max_steps: int = None):
+    """
+    Runs the scenarios in a process pool, one scenario per worker at a time
+    :param file_paths:  Paths of the scenario files
+    :param max_workers: Number of worker processes, number of cores if None
+    :param max_steps:   Upper bound for the number of steps of each scenario, STEP_LIMIT of the scenario if None
+    :return:            Dictionary of the columns of all events and scenarios, in the order of the given files
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        outputs = list(executor.map(partial(run_scenario, max_steps=max_steps), file_paths))
+    for scenario_id, (events, _) in enumerate(outputs):
+        events['scenario_id'] = np.full(len(events['pedestrian_id']), scenario_id, dtype=np.int32)
+    results = {}
+    for columns, index in [(EVENT_COLUMNS, 0), (SCENARIO_COLUMNS, 1)]:
+        for column in columns:
+            results[column] = np.concatenate([output[index][column] for output in outputs])
+    return results
+
+
+def save_results(results: dict, file_path: str):
+    """
+    Saves the results into a single columnar file, one array per column. They can be loaded back by `np.load`
+    :param results:     Dictionary of the columns of all events and scenarios
+    :param file_path:   Path to the results file (.npz)
+    :return:            None
+    """
+    np.savez_compressed(file_path, **results)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs the scenarios headless in parallel')
+    parser.add_argument('paths', nargs='+', help='directories, glob patterns or paths of the scenario files')
+    parser.add_argument('--output', default='results.npz', help='path to the results file')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes, all cores by default')
+    parser.add_argument('--max-steps', type=int, default=None,
+                        help='upper bound for the number of steps of each scenario, STEP_LIMIT of the '
+                             'scenario by default')
+    args = parser.parse_args()
+    scenario_file_paths = find_scenarios(args.paths)
+    if not scenario_file_paths:
+        parser.error('no scenario file is found')
+    print('Running {} scenario(s).'.format(len(scenario_file_paths)))
+    scenario_results = run_scenarios(scenario_file_paths, args.workers, args.max_steps)
+    save_results(scenario_results, args.output)
+    print('{} event(s) are saved to {}.'.format(len(scenario_results['scenario_id']), args.output))
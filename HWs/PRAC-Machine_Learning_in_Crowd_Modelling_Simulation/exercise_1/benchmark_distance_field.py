@@ -0,0 +1,129 @@
+import argparse
+import random
+import time
+from queue import PriorityQueue
+
+import numpy as np
+
+from distance_field import DIR_X, DIR_Y, compute_distance_field, get_direction_costs
+
+
+class BenchmarkConfiguration:
+    """
+    Class representing the part of the simulation configuration needed by the distance field computation
+    Attributes:
+        DISTANCE_BY_ROW:            Distance between two not-diagonally adjacent rows
+        DISTANCE_BY_COL:            Distance between two not-diagonally adjacent columns
+        DISTANCE_BY_DIAG:           Distance between two diagonally adjacent rows
+        OBSTACLE_AVOIDANCE_FLAG:    The flag that indicates the pedestrian behavior. Obstacle will be avoided if set as 1
+        OBSTACLE_EXTRA_COST:        Cost to be used during computation of the best paths
+    """
+
+    def __init__(self, obstacle_avoidance_flag: bool, obstacle_extra_cost: float):
+        self.DISTANCE_BY_ROW = 1.0
+        self.DISTANCE_BY_COL = 1.0
+        self.DISTANCE_BY_DIAG = np.sqrt(2.0)
+        self.OBSTACLE_AVOIDANCE_FLAG = obstacle_avoidance_flag
+        self.OBSTACLE_EXTRA_COST = obstacle_extra_cost
+
+
+def legacy_dijkstra(is_obstacle: np.ndarray, target: tuple, sim_conf: BenchmarkConfiguration):
+    """
+    The former implementation of PathCalculator.dijkstra working on nested lists with a PriorityQueue
+    :param is_obstacle: 2D boolean array indicating the obstacle cells
+    :param target:      Coordinates of the target cell
+    :param sim_conf:    Configuration of the distance field computation
+    :return:            2D array storing distance of cells to the target cell
+    """
+    n_row, n_col = is_obstacle.shape
+    obstacles = is_obstacle.tolist()
+    directions = list(zip(DIR_X.tolist(), DIR_Y.tolist(), get_direction_costs(sim_conf).tolist()))
+    target_x, target_y = target
+    heap = PriorityQueue()
+    heap.put((.0, target_x, target_y))
+    visited = [[False for _ in range(n_col)] for _ in range(n_row)]
+    dist_to_target = [[float("inf") for _ in range(n_col)] for _ in range(n_row)]
+    dist_to_target[target_x][target_y] = .0
+
+    while not heap.empty():
+        dist, x, y = heap.get()
+        if visited[x][y]:
+            continue
+        visited[x][y] = True
+        for dir_x, dir_y, dir_cost in directions:
+            new_x = x + dir_x
+            new_y = y + dir_y
+            if new_x < 0 or new_x >= n_row or new_y < 0 or new_y >= n_col:
+                continue
+            if visited[new_x][new_y]:
+                continue
+            if sim_conf.OBSTACLE_AVOIDANCE_FLAG and obstacles[new_x][new_y]:
+                continue
+            new_dist = dist + dir_cost
+            if not sim_conf.OBSTACLE_AVOIDANCE_FLAG and obstacles[new_x][new_y]:
+                new_dist += sim_conf.OBSTACLE_EXTRA_COST
+            if new_dist >= dist_to_target[new_x][new_y]:
+                continue
+            dist_to_target[new_x][new_y] = new_dist
+            heap.put((new_dist, new_x, new_y))
+    return np.array(dist_to_target)
+
+
+def generate_obstacles(size: int, seed: int = 0):
+    """
+    Generates a square grid with randomly placed wall segments covering roughly 5% of the cells, leaving the middle row
+    and column free so that the target in the middle is reachable
+    :param size:    Number of rows (and columns) in the grid
+    :param seed:    Seed of the random number generator
+    :return:        2D boolean array indicating the obstacle cells
+    """
+    rng = random.Random(seed)
+    is_obstacle = np.zeros((size, size), dtype=bool)
+    wall_length = max(size // 20, 1)
+    for _ in range(size):
+        x, y = rng.randrange(size), rng.randrange(size)
+        if rng.random() < .5:
+            is_obstacle[x, y:y + wall_length] = True
+        else:
+            is_obstacle[x:x + wall_length, y] = True
+    is_obstacle[size // 2, :] = False
+    is_obstacle[:, size // 2] = False
+    return is_obstacle
+
+
+def benchmark(sizes, legacy_max_size, obstacle_avoidance_flag, obstacle_extra_cost):
+    """
+    Compares the running times of the legacy and the array-based distance field computations
+    :param sizes:                   Grid sizes (number of rows and columns) to be benchmarked
+    :param legacy_max_size:         The largest grid size the legacy implementation is run for
+    :param obstacle_avoidance_flag: The flag that indicates the pedestrian behavior
+    :param obstacle_extra_cost:     Cost to be added for obstacle cells if they are not avoided
+    :return:                        None
+    """
+    sim_conf = BenchmarkConfiguration(obstacle_avoidance_flag, obstacle_extra_cost)
+    print('{:>8} {:>12} {:>12} {:>8}'.format('size', 'legacy (s)', 'array (s)', 'speedup'))
+    for size in sizes:
+        is_obstacle = generate_obstacles(size)
+        target = (size // 2, size // 2)
+        start = time.perf_counter()
+        dist_to_target = compute_distance_field(is_obstacle, target, sim_conf)
+        array_time = time.perf_counter() - start
+        if size > legacy_max_size:
+            print('{:>8} {:>12} {:>12.3f} {:>8}'.format(size, '-', array_time, '-'))
+            continue
+        start = time.perf_counter()
+        legacy_dist_to_target = legacy_dijkstra(is_obstacle, target, sim_conf)
+        legacy_time = time.perf_counter() - start
+        assert np.array_equal(dist_to_target, legacy_dist_to_target), 'distance fields differ for size {}'.format(size)
+        print('{:>8} {:>12.3f} {:>12.3f} {:>8.1f}'.format(size, legacy_time, array_time, legacy_time / array_time))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the distance field computation')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 100, 250, 500, 1000, 2000])
+    parser.add_argument('--legacy-max-size', type=int, default=2000,
+                        help='the largest grid size to run the legacy implementation for')
+    parser.add_argument('--obstacle-extra-cost', type=float, default=None,
+                        help='do not avoid obstacles but add the given cost to them')
+    args = parser.parse_args()
+    benchmark(args.sizes, args.legacy_max_size, args.obstacle_extra_cost is None, args.obstacle_extra_cost or .0)
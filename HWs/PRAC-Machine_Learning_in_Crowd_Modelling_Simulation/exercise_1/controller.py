@@ -1,5 +1,7 @@
 from queue import PriorityQueue
 
+from distance_field import NO_DIRECTION
+from event_log import ARRIVE, MOVE, STUCK, EventLog
 from grid import Grid
 from path_calculator import PathCalculator
 from pygame_conf import PygameConfiguration
@@ -13,6 +15,7 @@ class Controller:
     Attributes:
         grid:               Grid to be controlled
         heap:               Priority queue that stores moves according to their priority
+        event_log:          Log of the moves, arrivals and stuck pedestrians in the order they happen
     """
 
     def __init__(self, grid: Grid, path_calculator: PathCalculator):
@@ -20,6 +23,7 @@ class Controller:
         self.path_calculator = path_calculator
         self.heap = PriorityQueue()
         self.occupied_positions = set()
+        self.event_log = EventLog()
 
         for pedestrian in grid.pedestrians:
             pedestrian_id = pedestrian.ID
@@ -32,11 +36,16 @@ class Controller:
     def make_move(self, current_timestamp: float):
         """
         Makes the most prior move
-        :return: None
+        :return: Positions of the cells whose states have changed, to be redrawn
         """
         pygame_conf = PygameConfiguration.instance()
         delta_timestamp = pygame_conf.DISPLAY_DELTA_TIMESTAMP
         cells = self.grid.cells
+        directions = self.path_calculator.DIRECTIONS
+        # positions whose occupancy might have changed, to be reflected to the dynamic floor field
+        changed_positions = []
+        # positions of the cells whose states have changed
+        dirty_positions = set()
 
         while not self.heap.empty():
             # fetch the most prior move
@@ -55,29 +64,37 @@ class Controller:
                 # set the current cell as visited, remove it from occupied positions and move the pedestrian
                 cells[pedestrian_x][pedestrian_y].set_state(State.VISITED, pedestrian.TRACK_COLOR)
                 self.occupied_positions.remove(pedestrian.position)
+                changed_positions.append(pedestrian.position)
+                dirty_positions.add(pedestrian.position)
                 pedestrian.position = next_pedestrian_position
+                dirty_positions.add(pedestrian.position)
                 pedestrian_x, pedestrian_y = pedestrian.position
                 # check if the pedestrian reached the target or not
                 if cells[pedestrian_x][pedestrian_y].state is State.TARGET:
                     pedestrian.has_arrived = True
-                    self.grid.TARGET_CELL.pedestrians_on_target.append(pedestrian.ID + 1)
+                    self.event_log.append(event_time, pedestrian_id, pedestrian.position, ARRIVE)
+                    self.grid.get_target_cell(pedestrian.position).pedestrians_on_target.append(pedestrian.ID + 1)
                     print('Pedestrian {} has arrived to the target at {}.'.format(pedestrian.ID + 1, event_time))
                     continue
                 else:
                     cells[pedestrian_x][pedestrian_y].set_state(State.PEDESTRIAN)
+                    self.event_log.append(event_time, pedestrian_id, pedestrian.position, MOVE)
 
             pedestrian_found_adjacent_cell = False
-            best_paths = self.path_calculator.all_best_paths[pedestrian_x][pedestrian_y]
+            best_directions = self.path_calculator.best_directions[pedestrian_x, pedestrian_y].tolist()
 
             # decide the next cell to visit for the pedestrian considering currently occupied cells and obstacles
-            for path in best_paths:
-                direction = path.DIRECTION
+            for direction_id in best_directions:
+                if direction_id == NO_DIRECTION:
+                    break
+                direction = directions[direction_id]
                 pedestrian_new_x = pedestrian_x + direction.DIR_X
                 pedestrian_new_y = pedestrian_y + direction.DIR_Y
                 pedestrian_new_position = (pedestrian_new_x, pedestrian_new_y)
                 # if the best cell to visit is an obstacle, then the pedestrian gets stuck
                 if cells[pedestrian_new_x][pedestrian_new_y].state is State.OBSTACLE:
                     pedestrian.has_stuck = True
+                    self.event_log.append(event_time, pedestrian_id, pedestrian.position, STUCK)
                     print('Pedestrian {} has stuck at the cell({},{}) at timestamp {}.'.format(pedestrian.ID + 1,
                                                                                                pedestrian_x,
                                                                                                pedestrian_y,
@@ -88,6 +105,7 @@ class Controller:
                     # making the absorbing target cell occupied would lead pedestrians arriving at different times
                     if cells[pedestrian_new_x][pedestrian_new_y].state is not State.TARGET:
                         self.occupied_positions.add(pedestrian_new_position)
+                        changed_positions.append(pedestrian_new_position)
                     new_event_time = event_time + direction.DIR_COST / pedestrian.SPEED
                     self.heap.put((new_event_time, pedestrian_id, pedestrian_new_position))
                     pedestrian_found_adjacent_cell = True
@@ -96,3 +114,6 @@ class Controller:
             # if the pedestrian is not stuck, and he has no cell to visit, let him wait for delta_timestamp
             if not pedestrian.has_stuck and not pedestrian_found_adjacent_cell:
                 self.heap.put((current_timestamp + delta_timestamp, pedestrian_id, pedestrian.position))
+
+        self.path_calculator.update_occupancy(changed_positions, self.occupied_positions)
+        return dirty_positions
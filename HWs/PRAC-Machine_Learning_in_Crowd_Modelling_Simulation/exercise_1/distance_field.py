@@ -0,0 +1,167 @@
+import heapq
+
+import numpy as np
+
+from sim_conf import SimulationConfiguration
+
+# 8 possible directions (4 by row, 4 by column), in the same order as PathCalculator.DIRECTIONS
+DIR_X = np.array([1, -1, 0, 0, 1, 1, -1, -1], dtype=np.int64)
+DIR_Y = np.array([0, 0, 1, -1, 1, -1, 1, -1], dtype=np.int64)
+
+# direction id used to pad the best directions of the cells having less than 8 adjacent cells to follow
+NO_DIRECTION = 255
+
+
+def get_direction_costs(sim_conf: SimulationConfiguration):
+    """
+    Retrieves the distance costs of the directions given in DIR_X and DIR_Y
+    :param sim_conf:    Configuration of the simulation
+    :return:            Array storing the cost of going to the adjacent cell for each direction
+    """
+    return np.array([sim_conf.DISTANCE_BY_ROW, sim_conf.DISTANCE_BY_ROW,
+                     sim_conf.DISTANCE_BY_COL, sim_conf.DISTANCE_BY_COL,
+                     sim_conf.DISTANCE_BY_DIAG, sim_conf.DISTANCE_BY_DIAG,
+                     sim_conf.DISTANCE_BY_DIAG, sim_conf.DISTANCE_BY_DIAG], dtype=np.float64)
+
+
+def get_neighbour_offsets(n_col: int):
+    """
+    Retrieves the offsets of the adjacent cells in a flattened grid padded by one cell on each side
+    :param n_col:   Number of columns in the grid (without padding)
+    :return:        Array storing the flat index offset of the adjacent cell for each direction
+    """
+    return DIR_X * (n_col + 2) + DIR_Y
+
+
+def compute_distance_field(is_obstacle: np.ndarray, target: tuple, sim_conf: SimulationConfiguration):
+    """
+    The dijkstra algorithm to find the distance between the target cell and all cells. The grid is flattened and padded
+    by one cell on each side, so that the adjacent cells are found by precomputed offsets without boundary checks.
+    The cells are popped in the same order as PathCalculator did before, hence the distances are the same
+    :param is_obstacle: 2D boolean array indicating the obstacle cells
+    :param target:      Coordinates of the target cell
+    :param sim_conf:    Configuration of the simulation
+    :return:            2D array storing distance of cells to the target cell, inf for unreachable cells
+    """
+    n_row, n_col = is_obstacle.shape
+    neighbours = list(zip(get_neighbour_offsets(n_col).tolist(), get_direction_costs(sim_conf).tolist()))
+
+    # the padding and the obstacles to be avoided are marked as visited, so that they are never entered
+    visited = np.ones((n_row + 2, n_col + 2), dtype=bool)
+    visited[1:-1, 1:-1] = is_obstacle if sim_conf.OBSTACLE_AVOIDANCE_FLAG else False
+    # extra cost paid when entering a cell
+    extra_cost = np.zeros((n_row + 2, n_col + 2))
+    if not sim_conf.OBSTACLE_AVOIDANCE_FLAG:
+        extra_cost[1:-1, 1:-1][is_obstacle] = sim_conf.OBSTACLE_EXTRA_COST
+    visited = visited.ravel().tolist()
+    extra_cost = extra_cost.ravel().tolist()
+    dist_to_target = [float("inf")] * len(visited)
+
+    target_x, target_y = target
+    target_idx = (target_x + 1) * (n_col + 2) + target_y + 1
+    dist_to_target[target_idx] = .0
+    heap = [(.0, target_idx)]
+    heappop, heappush = heapq.heappop, heapq.heappush
+
+    while heap:
+        dist, idx = heappop(heap)
+        if visited[idx]:
+            continue
+        visited[idx] = True
+        for offset, dir_cost in neighbours:
+            new_idx = idx + offset
+            if visited[new_idx]:
+                continue
+            new_dist = dist + dir_cost + extra_cost[new_idx]
+            if new_dist < dist_to_target[new_idx]:
+                dist_to_target[new_idx] = new_dist
+                heappush(heap, (new_dist, new_idx))
+
+    return np.array(dist_to_target).reshape(n_row + 2, n_col + 2)[1:-1, 1:-1].copy()
+
+
+def compute_distance_fields(is_obstacle: np.ndarray, targets: list, sim_conf: SimulationConfiguration, cache=None):
+    """
+    Computes the distance field of each target and the combined field giving the distance to the closest target
+    :param is_obstacle: 2D boolean array indicating the obstacle cells
+    :param targets:     Coordinates of the target cells
+    :param sim_conf:    Configuration of the simulation
+    :param cache:       DistanceFieldCache to load the fields from and save the computed ones to, None to not cache
+    :return:            3D array storing the distance fields by target, and 2D array storing the combined field
+    """
+    dist_to_targets = np.empty((len(targets),) + is_obstacle.shape)
+    for target_id, target in enumerate(targets):
+        dist_to_target = cache.load(is_obstacle, target, sim_conf) if cache is not None else None
+        if dist_to_target is None:
+            dist_to_target = compute_distance_field(is_obstacle, target, sim_conf)
+            if cache is not None:
+                cache.save(is_obstacle, target, sim_conf, dist_to_target)
+        dist_to_targets[target_id] = dist_to_target
+    # a multi-source dijkstra is the same as taking the shortest distance among the single-source ones
+    return dist_to_targets, dist_to_targets.min(axis=0)
+
+
+def compute_best_directions(dist_to_target: np.ndarray, sim_conf: SimulationConfiguration, block_size: int = 1 << 18):
+    """
+    Finds the best adjacent cells to follow to reach the target for all cells. For each cell, the directions are sorted
+    by the distance to the target going through the adjacent cell in the given direction, the ties are kept in the
+    order of the directions. The adjacent cells without a path to the target are not considered
+    :param dist_to_target:  2D array storing distance of cells to the target cell
+    :param sim_conf:        Configuration of the simulation
+    :param block_size:      Approximate number of cells to be processed at once, bounds the temporary memory usage
+    :return:                3D uint8 array storing the sorted direction ids for all cells, padded with NO_DIRECTION
+    """
+    n_row, n_col = dist_to_target.shape
+    n_direction = len(DIR_X)
+    dir_costs = get_direction_costs(sim_conf)
+    padded = np.full((n_row + 2, n_col + 2), np.inf)
+    padded[1:-1, 1:-1] = dist_to_target
+    best_directions = np.empty((n_row, n_col, n_direction), dtype=np.uint8)
+
+    block_rows = max(1, block_size // max(n_col, 1))
+    for row_start in range(0, n_row, block_rows):
+        row_end = min(row_start + block_rows, n_row)
+        path_dist = np.empty((row_end - row_start, n_col, n_direction))
+        for direction in range(n_direction):
+            dir_x, dir_y = DIR_X[direction], DIR_Y[direction]
+            path_dist[:, :, direction] = padded[row_start + 1 + dir_x:row_end + 1 + dir_x, 1 + dir_y:n_col + 1 + dir_y]
+            path_dist[:, :, direction] += dir_costs[direction]
+        # cells without a path to the target have no adjacent cells to follow
+        path_dist[np.isinf(dist_to_target[row_start:row_end])] = np.inf
+        best_directions[row_start:row_end] = _sort_directions(path_dist)
+
+    return best_directions
+
+
+def compute_best_directions_at(dist_to_target: np.ndarray, cells_x: np.ndarray, cells_y: np.ndarray,
+                               sim_conf: SimulationConfiguration):
+    """
+    Finds the best adjacent cells to follow to reach the target for the given cells, same as compute_best_directions
+    :param dist_to_target:  2D array storing distance of cells to the target cell
+    :param cells_x:         Row ids of the cells
+    :param cells_y:         Column ids of the cells
+    :param sim_conf:        Configuration of the simulation
+    :return:                2D uint8 array storing the sorted direction ids for the given cells
+    """
+    n_row, n_col = dist_to_target.shape
+    adjacent_x = cells_x[:, None] + DIR_X
+    adjacent_y = cells_y[:, None] + DIR_Y
+    is_inside = (adjacent_x >= 0) & (adjacent_x < n_row) & (adjacent_y >= 0) & (adjacent_y < n_col)
+    path_dist = np.where(is_inside, dist_to_target[np.clip(adjacent_x, 0, n_row - 1), np.clip(adjacent_y, 0, n_col - 1)],
+                         np.inf)
+    path_dist += get_direction_costs(sim_conf)
+    path_dist[np.isinf(dist_to_target[cells_x, cells_y])] = np.inf
+    return _sort_directions(path_dist)
+
+
+def _sort_directions(path_dist: np.ndarray):
+    """
+    Sorts the directions by the distances of the paths going through them
+    :param path_dist:   Array storing the path distances in its last axis for each direction, inf if there is no path
+    :return:            uint8 array storing the sorted direction ids, padded with NO_DIRECTION
+    """
+    # stable sort keeps the order of the directions for the paths with equal distances
+    sorted_directions = np.argsort(path_dist, axis=-1, kind='stable').astype(np.uint8)
+    n_paths = np.count_nonzero(np.isfinite(path_dist), axis=-1)
+    sorted_directions[np.arange(len(DIR_X)) >= n_paths[..., None]] = NO_DIRECTION
+    return sorted_directions
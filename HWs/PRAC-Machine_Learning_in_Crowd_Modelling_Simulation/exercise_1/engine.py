@@ -0,0 +1,336 @@
+import numpy as np
+
+from distance_field import DIR_X, DIR_Y, NO_DIRECTION, compute_best_directions, compute_distance_fields, \
+    get_direction_costs
+from field_cache import DistanceFieldCache
+from floor_field import DynamicFloorField
+from sim_conf import SimulationConfiguration
+from state import State
+
+# dictionary to ease the conversion between the states of the cells and the codes stored in the state array
+state_code_dict = {
+    State.EMPTY: 0,
+    State.PEDESTRIAN: 1,
+    State.OBSTACLE: 2,
+    State.TARGET: 3,
+    State.VISITED: 4
+}
+
+EMPTY = state_code_dict[State.EMPTY]
+PEDESTRIAN = state_code_dict[State.PEDESTRIAN]
+OBSTACLE = state_code_dict[State.OBSTACLE]
+TARGET = state_code_dict[State.TARGET]
+VISITED = state_code_dict[State.VISITED]
+
+# offsets of the cells in the 3x3 neighbourhood of a cell, including the cell itself
+REGION_X = np.repeat(np.arange(-1, 2), 3)
+REGION_Y = np.tile(np.arange(-1, 2), 3)
+
+NO_RANK = np.iinfo(np.int64).max
+
+
+class SimulationEngine:
+    """
+    Headless counterpart of Grid, PathCalculator and Controller. The grid is stored as NumPy arrays and the pedestrians
+    as structure of arrays, so that all moves due at a timestamp are processed in batch while the result is the same
+    as processing them one by one in the order of the priority queue of Controller
+
+    Attributes:
+        sim_conf:           Configuration of the simulation
+        state:              2D array storing the state codes of the cells
+        visited_by:         2D array storing the id of the last pedestrian visiting the cell, -1 otherwise
+        occupied:           2D array indicating the cells occupied (or reserved) by pedestrians
+        TARGETS:            Coordinates of the target cells
+        dist_to_targets:    3D array storing distance of cells to each target cell
+        dist_to_target:     2D array storing distance of cells to the closest target cell, including the density costs
+                            if the dynamic floor field is active
+        floor_field:        The dynamic floor field updated at the end of each step, None if the field is static
+        best_directions:    3D array storing the directions to follow to reach the target sorted for all cells,
+                            padded with NO_DIRECTION
+        DIR_COSTS:          Cost of going to the adjacent cell for each direction
+        positions:          Current coordinates of the pedestrians in the format of (x, y)
+        next_positions:     Coordinates of the pedestrians after their next events
+        speeds:             Move speeds of the pedestrians within the grid
+        next_event_times:   Timestamps of the next events of the pedestrians
+        has_event:          True if pedestrian has an event waiting to be processed
+        has_arrived:        True if pedestrian has arrived to the target
+        has_stuck:          True if pedestrian has stuck in the grid
+        arrival_times:      Timestamps of the arrivals to the target, nan if pedestrian has not arrived
+        arrival_targets:    Ids of the targets the pedestrians have arrived to, -1 if pedestrian has not arrived
+        stuck_times:        Timestamps of the pedestrians getting stuck, nan if pedestrian has not stuck
+    """
+
+    def __init__(self, sim_conf: SimulationConfiguration):
+        self.sim_conf = sim_conf
+        grid_configuration = sim_conf.GRID
+        n_row, n_col = sim_conf.N_ROW, sim_conf.N_COL
+
+        self.state = np.full((n_row, n_col), EMPTY, dtype=np.int8)
+        self.visited_by = np.full((n_row, n_col), -1, dtype=np.int32)
+        self.occupied = np.zeros((n_row, n_col), dtype=bool)
+
+        pedestrians = np.asarray(grid_configuration['PEDESTRIANS'], dtype=np.float64).reshape(-1, 3)
+        n_pedestrian = pedestrians.shape[0]
+        self.positions = pedestrians[:, :2].astype(np.int64)
+        self.next_positions = self.positions.copy()
+        self.speeds = pedestrians[:, 2].copy()
+        self.next_event_times = np.zeros(n_pedestrian)
+        self.has_event = np.ones(n_pedestrian, dtype=bool)
+        self.has_arrived = np.zeros(n_pedestrian, dtype=bool)
+        self.has_stuck = np.zeros(n_pedestrian, dtype=bool)
+        self.arrival_times = np.full(n_pedestrian, np.nan)
+        self.arrival_targets = np.full(n_pedestrian, -1, dtype=np.int32)
+        self.stuck_times = np.full(n_pedestrian, np.nan)
+
+        self.state[self.positions[:, 0], self.positions[:, 1]] = PEDESTRIAN
+        self.occupied[self.positions[:, 0], self.positions[:, 1]] = True
+
+        # read the obstacle attributes from config then process them
+        for obstacle_position in grid_configuration.get('OBSTACLES', []):
+            rect_top_left_x, rect_top_left_y, rect_bottom_right_x, rect_bottom_right_y = tuple(obstacle_position)
+            self.state[rect_top_left_x:rect_bottom_right_x + 1, rect_top_left_y:rect_bottom_right_y + 1] = OBSTACLE
+
+        # specify target cells in the grid
+        self.TARGETS = sim_conf.TARGETS
+        self._target_ids = np.full((n_row, n_col), -1, dtype=np.int32)
+        for target_id, target in enumerate(self.TARGETS):
+            self.state[target] = TARGET
+            self._target_ids[target] = target_id
+
+        self.DIR_COSTS = get_direction_costs(sim_conf)
+        cache = DistanceFieldCache.from_configuration(sim_conf)
+        self.dist_to_targets, self.dist_to_target = compute_distance_fields(self.state == OBSTACLE, self.TARGETS,
+                                                                            sim_conf, cache)
+        self.floor_field = None
+        if sim_conf.DENSITY_COST is None:
+            self.best_directions = compute_best_directions(self.dist_to_target, sim_conf)
+        else:
+            self.floor_field = DynamicFloorField(self.state == OBSTACLE, self.TARGETS, sim_conf, self.occupied)
+            self.dist_to_target = self.floor_field.dist_to_target
+            self.best_directions = self.floor_field.best_directions
+        # cells whose occupancy might have changed since the last update of the floor field
+        self._changed_x = []
+        self._changed_y = []
+
+        # rank grids used to detect the moves depending on each other, padded by one cell on each side
+        self._write_ranks = np.full((n_row + 2, n_col + 2), NO_RANK, dtype=np.int64)
+        self._region_ranks = np.full((n_row + 2, n_col + 2), NO_RANK, dtype=np.int64)
+
+    @classmethod
+    def from_file(cls, file_path: str):
+        """
+        Creates the engine from a configuration file without initiating pygame
+        :param file_path:   Path to the configuration file in the format of `pygame_configuration.json`
+        :return:            The engine object
+        """
+        return cls(SimulationConfiguration(file_path))
+
+    @property
+    def n_pedestrian(self):
+        return self.positions.shape[0]
+
+    def is_finished(self):
+        """
+        Checks if every pedestrian has arrived or got stuck (if the stuck pedestrians are not waited for)
+        :return:    True if the simulation is finished
+        """
+        finished = self.has_arrived
+        if self.sim_conf.STOP_DISPLAY_AFTER_STUCK:
+            finished = finished | self.has_stuck
+        return bool(np.all(finished))
+
+    def run(self, max_steps: int = None):
+        """
+        Advances the simulation by DISPLAY_DELTA_TIMESTAMP until the simulation is finished, or until no pedestrian has
+        an event left, i.e. the remaining ones are stuck while the stuck pedestrians are waited for
+        :param max_steps:   Upper bound for the number of steps, STEP_LIMIT of the configuration if None (unlimited if
+                            it is not active)
+        :return:            The number of steps and the timestamp where the simulation has stopped
+        """
+        if max_steps is None:
+            max_steps = self.sim_conf.STEP_LIMIT
+        delta_timestamp = self.sim_conf.DISPLAY_DELTA_TIMESTAMP
+        current_timestamp = .0
+        current_step_count = 0
+        # the stuck pedestrians have no events, so nothing changes once only they are left
+        while not self.is_finished() and self.has_event.any() \
+                and (max_steps is None or current_step_count < max_steps):
+            self.make_move(current_timestamp)
+            current_timestamp += delta_timestamp
+            current_step_count += 1
+        return current_step_count, current_timestamp
+
+    def make_move(self, current_timestamp: float):
+        """
+        Makes all moves whose event time is not later than the current timestamp
+        :param current_timestamp:   The timestamp the simulation is advanced to
+        :return:                    None
+        """
+        min_dir_cost = self.DIR_COSTS.min()
+        while True:
+            pedestrian_ids = np.flatnonzero(self.has_event & (self.next_event_times <= current_timestamp))
+            if pedestrian_ids.size == 0:
+                break
+            event_times = self.next_event_times[pedestrian_ids]
+            # same order as the priority queue of Controller: by event time, then by pedestrian id
+            order = np.lexsort((pedestrian_ids, event_times))
+            pedestrian_ids, event_times = pedestrian_ids[order], event_times[order]
+            # events created in this batch might precede the later ones, keep the events that surely come before them
+            horizon = np.minimum.accumulate(event_times + min_dir_cost / self.speeds[pedestrian_ids])
+            n_batch = 1 + np.count_nonzero(event_times[1:] < horizon[:-1])
+            self._process_events(pedestrian_ids[:n_batch], current_timestamp)
+
+        if self.floor_field is not None and self._changed_x:
+            changed_x, changed_y = np.concatenate(self._changed_x), np.concatenate(self._changed_y)
+            self.floor_field.update(changed_x, changed_y, self.occupied[changed_x, changed_y])
+            self._changed_x, self._changed_y = [], []
+
+    def _process_events(self, pedestrian_ids: np.ndarray, current_timestamp: float):
+        """
+        Processes the given events sorted by priority. At each round, the decisions of the remaining pedestrians are
+        computed at once, then the ones which are not affected by the earlier remaining pedestrians are committed
+        :param pedestrian_ids:      Ids of the pedestrians whose events are processed, sorted by priority
+        :param current_timestamp:   The timestamp the simulation is advanced to
+        :return:                    None
+        """
+        self.has_event[pedestrian_ids] = False
+        while pedestrian_ids.size:
+            decisions = self._decide(pedestrian_ids)
+            committed = self._find_committable(decisions)
+            self._commit({key: value[committed] for key, value in decisions.items()}, current_timestamp)
+            pedestrian_ids = pedestrian_ids[~committed]
+
+    def _decide(self, pedestrian_ids: np.ndarray):
+        """
+        Computes the decisions of the pedestrians as if each of them were the next one in the priority queue
+        :param pedestrian_ids:  Ids of the pedestrians sorted by priority
+        :return:                Dictionary of arrays describing the moves, the scanned cells and the decisions
+        """
+        old_x, old_y = self.positions[pedestrian_ids].T
+        new_x, new_y = self.next_positions[pedestrian_ids].T
+        is_moving = (old_x != new_x) | (old_y != new_y)
+        is_arriving = is_moving & (self.state[new_x, new_y] == TARGET)
+
+        # cells to check in the order of best paths, a pedestrian on its way to the target does not check any cell
+        options = self.best_directions[new_x, new_y]
+        is_option = (options != NO_DIRECTION) & ~is_arriving[:, None]
+        directions = np.where(is_option, options, 0)
+        option_x = np.where(is_option, new_x[:, None] + DIR_X[directions], new_x[:, None])
+        option_y = np.where(is_option, new_y[:, None] + DIR_Y[directions], new_y[:, None])
+        is_obstacle = is_option & (self.state[option_x, option_y] == OBSTACLE)
+        # the own cell of the pedestrian is left before deciding the next cell
+        is_own_cell = is_moving[:, None] & (option_x == old_x[:, None]) & (option_y == old_y[:, None])
+        is_free = is_option & ~is_obstacle & (~self.occupied[option_x, option_y] | is_own_cell)
+
+        is_hit = is_obstacle | is_free
+        has_hit = is_hit.any(axis=1)
+        first_hit = is_hit.argmax(axis=1)
+        rows = np.arange(pedestrian_ids.size)
+        is_stuck = has_hit & is_obstacle[rows, first_hit]
+        is_stepping = has_hit & ~is_stuck
+        is_scanned = is_option & (~has_hit[:, None] | (np.arange(len(DIR_X)) <= first_hit[:, None]))
+
+        return {
+            'pedestrian_ids': pedestrian_ids, 'old_x': old_x, 'old_y': old_y, 'new_x': new_x, 'new_y': new_y,
+            'is_moving': is_moving, 'is_arriving': is_arriving, 'is_stuck': is_stuck, 'is_stepping': is_stepping,
+            'direction': directions[rows, first_hit], 'step_x': option_x[rows, first_hit],
+            'step_y': option_y[rows, first_hit], 'option_x': option_x, 'option_y': option_y,
+            'is_scanned': is_scanned
+        }
+
+    def _find_committable(self, decisions: dict):
+        """
+        Finds the decisions which are the same as the ones made by processing the pedestrians one by one. A decision is
+        committable if no earlier pedestrian writes into the cells scanned by the pedestrian, and if the pedestrian
+        does not touch the neighbourhood of an earlier pedestrian whose decision is not committable
+        :param decisions:   Decisions of the pedestrians sorted by priority
+        :return:            Boolean array marking the committable decisions
+        """
+        n_decision = decisions['pedestrian_ids'].size
+        ranks = np.arange(n_decision)
+        scanned_x = decisions['option_x'] + 1
+        scanned_y = decisions['option_y'] + 1
+        is_scanned = decisions['is_scanned']
+        is_moving = decisions['is_moving']
+        is_reserving = decisions['is_stepping']
+
+        # cells written by the decisions: the left cells and the reserved cells
+        write_x = np.concatenate([decisions['old_x'][is_moving], decisions['step_x'][is_reserving]]) + 1
+        write_y = np.concatenate([decisions['old_y'][is_moving], decisions['step_y'][is_reserving]]) + 1
+        write_ranks = np.concatenate([ranks[is_moving], ranks[is_reserving]])
+        np.minimum.at(self._write_ranks, (write_x, write_y), write_ranks)
+        earliest_writer = np.where(is_scanned, self._write_ranks[scanned_x, scanned_y], NO_RANK).min(axis=1)
+        self._write_ranks[write_x, write_y] = NO_RANK
+        committed = earliest_writer >= ranks
+
+        # cells touched by the decisions: the scanned cells and the left cell
+        touched_x = np.concatenate([scanned_x, decisions['old_x'][:, None] + 1], axis=1)
+        touched_y = np.concatenate([scanned_y, decisions['old_y'][:, None] + 1], axis=1)
+        is_touched = np.concatenate([is_scanned, np.ones((n_decision, 1), dtype=bool)], axis=1)
+        while not committed.all():
+            # an uncommitted pedestrian might leave its cell and reserve any cell in its neighbourhood
+            region_x = (decisions['new_x'][~committed, None] + 1 + REGION_X).ravel()
+            region_y = (decisions['new_y'][~committed, None] + 1 + REGION_Y).ravel()
+            region_ranks = np.repeat(ranks[~committed], REGION_X.size)
+            np.minimum.at(self._region_ranks, (region_x, region_y), region_ranks)
+            earliest_region = np.where(is_touched, self._region_ranks[touched_x, touched_y], NO_RANK).min(axis=1)
+            self._region_ranks[region_x, region_y] = NO_RANK
+            new_committed = committed & (earliest_region > ranks)
+            if np.array_equal(new_committed, committed):
+                break
+            committed = new_committed
+        return committed
+
+    def _commit(self, decisions: dict, current_timestamp: float):
+        """
+        Applies the given decisions, which are independent of each other, to the grid and the pedestrians
+        :param decisions:           Decisions of the pedestrians
+        :param current_timestamp:   The timestamp the simulation is advanced to
+        :return:                    None
+        """
+        pedestrian_ids = decisions['pedestrian_ids']
+        event_times = self.next_event_times[pedestrian_ids]
+
+        # set the left cells as visited, remove them from occupied cells and move the pedestrians
+        is_moving = decisions['is_moving']
+        moving_ids = pedestrian_ids[is_moving]
+        old_x, old_y = decisions['old_x'][is_moving], decisions['old_y'][is_moving]
+        self.state[old_x, old_y] = VISITED
+        self.visited_by[old_x, old_y] = moving_ids
+        self.occupied[old_x, old_y] = False
+        self.positions[moving_ids] = self.next_positions[moving_ids]
+
+        is_arriving = decisions['is_arriving']
+        arriving_ids = pedestrian_ids[is_arriving]
+        self.has_arrived[arriving_ids] = True
+        self.arrival_times[arriving_ids] = event_times[is_arriving]
+        self.arrival_targets[arriving_ids] = self._target_ids[decisions['new_x'][is_arriving],
+                                                              decisions['new_y'][is_arriving]]
+        is_entering = is_moving & ~is_arriving
+        self.state[decisions['new_x'][is_entering], decisions['new_y'][is_entering]] = PEDESTRIAN
+
+        is_stuck = decisions['is_stuck']
+        self.has_stuck[pedestrian_ids[is_stuck]] = True
+        self.stuck_times[pedestrian_ids[is_stuck]] = event_times[is_stuck]
+
+        # making the absorbing target cell occupied would lead pedestrians arriving at different times
+        is_stepping = decisions['is_stepping']
+        stepping_ids = pedestrian_ids[is_stepping]
+        step_x, step_y = decisions['step_x'][is_stepping], decisions['step_y'][is_stepping]
+        self.occupied[step_x, step_y] |= self.state[step_x, step_y] != TARGET
+        self.next_positions[stepping_ids, 0] = step_x
+        self.next_positions[stepping_ids, 1] = step_y
+        step_costs = self.DIR_COSTS[decisions['direction'][is_stepping]]
+        self.next_event_times[stepping_ids] = event_times[is_stepping] + step_costs / self.speeds[stepping_ids]
+        self.has_event[stepping_ids] = True
+
+        # if the pedestrian is not stuck, and he has no cell to visit, let him wait for delta_timestamp
+        is_waiting = ~is_arriving & ~is_stuck & ~is_stepping
+        waiting_ids = pedestrian_ids[is_waiting]
+        self.next_positions[waiting_ids] = self.positions[waiting_ids]
+        self.next_event_times[waiting_ids] = current_timestamp + self.sim_conf.DISPLAY_DELTA_TIMESTAMP
+        self.has_event[waiting_ids] = True
+
+        if self.floor_field is not None:
+            self._changed_x.extend([old_x, step_x])
+            self._changed_y.extend([old_y, step_y])
@@ -0,0 +1,126 @@
+import numpy as np
+
+from state import State
+
+# codes of the event types stored in the event log
+MOVE = 0
+ARRIVE = 1
+STUCK = 2
+
+# record of an event, the pedestrian ids start from 0 as in Pedestrian.ID and (x, y) is the cell the pedestrian has
+# moved to, arrived at or got stuck in
+EVENT_DTYPE = np.dtype([
+    ('time', np.float64),
+    ('pedestrian_id', np.int32),
+    ('x', np.int32),
+    ('y', np.int32),
+    ('event_type', np.uint8)
+])
+
+
+class EventLog:
+    """
+    Class representing an append-only log of the simulation events, stored as a NumPy structured array. The array grows
+    by doubling its capacity, so that appending an event takes amortized constant time
+    Attributes:
+        n_event:    Number of events in the log
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._events = np.empty(capacity, dtype=EVENT_DTYPE)
+        self.n_event = 0
+
+    @property
+    def events(self):
+        return self._events[:self.n_event]
+
+    def append(self, time: float, pedestrian_id: int, position: tuple, event_type: int):
+        """
+        Appends an event to the log
+        :param time:            Timestamp of the event
+        :param pedestrian_id:   Id of the pedestrian
+        :param position:        Coordinates of the cell the event happens in
+        :param event_type:      Type of the event, one of MOVE, ARRIVE or STUCK
+        :return:                None
+        """
+        if self.n_event == len(self._events):
+            events = np.empty(2 * len(self._events), dtype=EVENT_DTYPE)
+            events[:self.n_event] = self._events
+            self._events = events
+        self._events[self.n_event] = (time, pedestrian_id, position[0], position[1], event_type)
+        self.n_event += 1
+
+    def save(self, file_path: str):
+        """
+        Saves the events into a `.npy` file
+        :param file_path:   Path to the file
+        :return:            None
+        """
+        np.save(file_path, self.events)
+
+    @staticmethod
+    def load(file_path: str):
+        """
+        Loads the events from a `.npy` file as a memory-mapped array, so that long logs are not read at once
+        :param file_path:   Path to the file
+        :return:            Structured array of the events
+        """
+        return np.load(file_path, mmap_mode='r')
+
+
+def get_trajectory(events: np.ndarray, pedestrian_id: int):
+    """
+    Extracts the trajectory of a pedestrian from the events
+    :param events:          Structured array of the events
+    :param pedestrian_id:   Id of the pedestrian
+    :return:                Timestamps and the coordinates of the cells the pedestrian has entered
+    """
+    is_step = (events['pedestrian_id'] == pedestrian_id) & (events['event_type'] != STUCK)
+    steps = events[is_step]
+    return steps['time'], np.stack([steps['x'], steps['y']], axis=1)
+
+
+class Replay:
+    """
+    Class replaying the logged events on a grid, so that the simulation can be displayed at any speed without computing
+    the moves again. The grid should be created from the same configuration as the logged simulation
+    Attributes:
+        grid:       Grid the events are replayed on
+        events:     Structured array of the events sorted by time
+        n_replayed: Number of events replayed
+    """
+
+    def __init__(self, grid, events: np.ndarray):
+        self.grid = grid
+        self.events = events[np.argsort(events['time'], kind='stable')]
+        self.n_replayed = 0
+
+    def is_finished(self):
+        return self.n_replayed == len(self.events)
+
+    def advance(self, current_timestamp: float):
+        """
+        Replays the events up to the current timestamp
+        :param current_timestamp:   The timestamp the replay is advanced to
+        :return:                    Positions of the cells whose states have changed, to be redrawn
+        """
+        cells = self.grid.cells
+        changed_positions = set()
+        n_event = np.searchsorted(self.events['time'], current_timestamp, side='right')
+        for _, pedestrian_id, x, y, event_type in self.events[self.n_replayed:n_event].tolist():
+            pedestrian = self.grid.pedestrians[pedestrian_id]
+            if event_type == STUCK:
+                pedestrian.has_stuck = True
+                continue
+            pedestrian_x, pedestrian_y = pedestrian.position
+            cells[pedestrian_x][pedestrian_y].set_state(State.VISITED, pedestrian.TRACK_COLOR)
+            changed_positions.add(pedestrian.position)
+            pedestrian.position = (x, y)
+            changed_positions.add(pedestrian.position)
+            if event_type == ARRIVE:
+                pedestrian.has_arrived = True
+                self.grid.get_target_cell(pedestrian.position).pedestrians_on_target.append(pedestrian_id + 1)
+            else:
+                cells[x][y].set_state(State.PEDESTRIAN)
+        self.n_replayed = max(self.n_replayed, n_event)
+        return changed_positions
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from sim_conf import SimulationConfiguration
+
+
+class DistanceFieldCache:
+    """
+    Class representing an on-disk cache of distance fields. A field is stored in a `.npy` file named by the hash of
+    everything it depends on: grid size, obstacles, distance costs, obstacle flags and target coordinates. Hence the
+    scenarios only differing in pedestrians share the same fields
+    Attributes:
+        FOLDER_PATH:    The folder where the distance fields are stored
+    """
+
+    def __init__(self, folder_path: str):
+        self.FOLDER_PATH = folder_path
+        os.makedirs(folder_path, exist_ok=True)
+
+    @classmethod
+    def from_configuration(cls, sim_conf: SimulationConfiguration):
+        """
+        Creates the cache given in the configuration
+        :param sim_conf:    Configuration of the simulation
+        :return:            The cache object, None if caching is not active
+        """
+        if sim_conf.CACHE_FOLDER_NAME is None:
+            return None
+        return cls(sim_conf.CACHE_FOLDER_NAME)
+
+    @staticmethod
+    def get_key(is_obstacle: np.ndarray, target: tuple, sim_conf: SimulationConfiguration):
+        """
+        Computes the key of a distance field
+        :param is_obstacle: 2D boolean array indicating the obstacle cells
+        :param target:      Coordinates of the target cell
+        :param sim_conf:    Configuration of the simulation
+        :return:            Hexadecimal hash of the inputs of the distance field computation
+        """
+        obstacle_avoidance_flag = bool(sim_conf.OBSTACLE_AVOIDANCE_FLAG)
+        # the extra cost does not change the field if the obstacles are avoided
+        obstacle_extra_cost = .0 if obstacle_avoidance_flag else sim_conf.OBSTACLE_EXTRA_COST
+        parameters = (is_obstacle.shape, sim_conf.DISTANCE_BY_ROW, sim_conf.DISTANCE_BY_COL, sim_conf.DISTANCE_BY_DIAG,
+                      obstacle_avoidance_flag, obstacle_extra_cost, tuple(int(coord) for coord in target))
+        key = hashlib.sha256(repr(parameters).encode())
+        key.update(np.packbits(is_obstacle).tobytes())
+        return key.hexdigest()
+
+    def _get_file_path(self, key: str):
+        return os.path.join(self.FOLDER_PATH, key + '.npy')
+
+    def load(self, is_obstacle: np.ndarray, target: tuple, sim_conf: SimulationConfiguration):
+        """
+        Loads a distance field from the cache
+        :param is_obstacle: 2D boolean array indicating the obstacle cells
+        :param target:      Coordinates of the target cell
+        :param sim_conf:    Configuration of the simulation
+        :return:            2D array storing distance of cells to the target cell, None if it is not cached
+        """
+        file_path = self._get_file_path(self.get_key(is_obstacle, target, sim_conf))
+        if not os.path.exists(file_path):
+            return None
+        return np.load(file_path)
+
+    def save(self, is_obstacle: np.ndarray, target: tuple, sim_conf: SimulationConfiguration,
+             dist_to_target: np.ndarray):
+        """
+        Saves a distance field to the cache. The file is written under a temporary name and then renamed, so that
+        concurrent simulations never read a partially written field
+        :param is_obstacle:     2D boolean array indicating the obstacle cells
+        :param target:          Coordinates of the target cell
+        :param sim_conf:        Configuration of the simulation
+        :param dist_to_target:  2D array storing distance of cells to the target cell
+        :return:                None
+        """
+        file_path = self._get_file_path(self.get_key(is_obstacle, target, sim_conf))
+        fd, tmp_path = tempfile.mkstemp(dir=self.FOLDER_PATH, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, dist_to_target)
+        os.replace(tmp_path, file_path)
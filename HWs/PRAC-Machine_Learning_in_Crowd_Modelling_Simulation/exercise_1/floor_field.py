@@ -0,0 +1,180 @@
+import heapq
+
+import numpy as np
+
+from distance_field import compute_best_directions, compute_best_directions_at, get_direction_costs, \
+    get_neighbour_offsets
+from sim_conf import SimulationConfiguration
+
+
+class DynamicFloorField:
+    """
+    Class representing a floor field where entering an occupied cell costs DENSITY_COST on top of the static distance
+    costs, so that pedestrians go around the crowded cells. When the occupancy changes, only the part of the field
+    depending on the changed cells is recomputed by a localized dijkstra run:
+        - if a cell gets occupied, the cells whose shortest path goes through it (its subtree in the shortest path tree)
+          are invalidated and recomputed starting from their valid neighbours
+        - if a cell gets free, its distance is decreased and the decrease is propagated to the neighbours
+
+    If the repair would touch a large part of the grid, e.g. when most of the pedestrians move at once, the field is
+    recomputed from scratch instead, which is cheaper than the bookkeeping of the localized runs.
+    The grid is flattened and padded by one cell on each side as in distance_field.compute_distance_field
+
+    Attributes:
+        sim_conf:           Configuration of the simulation
+        DENSITY_COST:       Extra cost of entering an occupied cell
+        dist_to_target:     2D array storing distance of cells to the closest target cell
+        best_directions:    3D array storing the directions to follow to reach the target sorted for all cells
+        RECOMPUTE_RATIO:    Ratio of the invalidated cells to all cells above which the field is recomputed from scratch
+    """
+
+    RECOMPUTE_RATIO = .25
+
+    def __init__(self, is_obstacle: np.ndarray, targets: list, sim_conf: SimulationConfiguration,
+                 occupied: np.ndarray):
+        """
+        Computes the floor field for the initial occupancy
+        :param is_obstacle: 2D boolean array indicating the obstacle cells
+        :param targets:     Coordinates of the target cells
+        :param sim_conf:    Configuration of the simulation
+        :param occupied:    2D boolean array indicating the occupied cells
+        """
+        self.sim_conf = sim_conf
+        self.DENSITY_COST = sim_conf.DENSITY_COST
+        n_row, n_col = is_obstacle.shape
+        self._shape = (n_row, n_col)
+        self._width = n_col + 2
+        self._neighbours = list(zip(get_neighbour_offsets(n_col).tolist(), get_direction_costs(sim_conf).tolist()))
+        self._region_offsets = np.append(get_neighbour_offsets(n_col), 0)
+
+        # the padding and the obstacles to be avoided are never entered
+        blocked = np.ones((n_row + 2, n_col + 2), dtype=bool)
+        blocked[1:-1, 1:-1] = is_obstacle if sim_conf.OBSTACLE_AVOIDANCE_FLAG else False
+        static_cost = np.zeros((n_row + 2, n_col + 2))
+        if not sim_conf.OBSTACLE_AVOIDANCE_FLAG:
+            static_cost[1:-1, 1:-1][is_obstacle] = sim_conf.OBSTACLE_EXTRA_COST
+        padded_occupied = np.zeros((n_row + 2, n_col + 2), dtype=bool)
+        padded_occupied[1:-1, 1:-1] = occupied
+
+        self._blocked = blocked.ravel().tolist()
+        self._static_cost = static_cost.ravel().tolist()
+        self._occupied = padded_occupied.ravel().tolist()
+        self._extra_cost = (static_cost + self.DENSITY_COST * padded_occupied).ravel().tolist()
+        self._sources = set(self._to_index(target_x, target_y) for target_x, target_y in targets)
+        self.dist_to_target = np.empty((n_row, n_col))
+        self.best_directions = np.empty((n_row, n_col, len(self._neighbours)), dtype=np.uint8)
+        self._recompute()
+
+    def _to_index(self, x: int, y: int):
+        return (x + 1) * self._width + y + 1
+
+    def _recompute(self):
+        """
+        Computes the whole field from the target cells for the current occupancy. The arrays are updated in place, so
+        that the references given out stay valid
+        :return: None
+        """
+        self._dist = [float("inf")] * len(self._blocked)
+        self._parent = [-1] * len(self._blocked)
+        heap = []
+        for source in self._sources:
+            self._dist[source] = .0
+            heap.append((.0, source))
+        heapq.heapify(heap)
+        self._propagate(heap, set())
+
+        n_row, n_col = self._shape
+        self.dist_to_target[:] = np.array(self._dist).reshape(n_row + 2, n_col + 2)[1:-1, 1:-1]
+        self.best_directions[:] = compute_best_directions(self.dist_to_target, self.sim_conf)
+
+    def _propagate(self, heap: list, changed: set):
+        """
+        Runs the dijkstra algorithm from the cells in the heap, whose distances are already set
+        :param heap:    Heap of (distance, flat index) pairs to start from
+        :param changed: Set to add the flat indices of the cells whose distances are changed
+        :return:        None
+        """
+        dist, parent, blocked, extra_cost = self._dist, self._parent, self._blocked, self._extra_cost
+        heappop, heappush = heapq.heappop, heapq.heappush
+        while heap:
+            cur_dist, idx = heappop(heap)
+            if cur_dist > dist[idx]:
+                continue
+            for offset, dir_cost in self._neighbours:
+                new_idx = idx + offset
+                if blocked[new_idx]:
+                    continue
+                new_dist = cur_dist + dir_cost + extra_cost[new_idx]
+                if new_dist < dist[new_idx]:
+                    dist[new_idx] = new_dist
+                    parent[new_idx] = idx
+                    changed.add(new_idx)
+                    heappush(heap, (new_dist, new_idx))
+
+    def update(self, cells_x: np.ndarray, cells_y: np.ndarray, occupied: np.ndarray):
+        """
+        Updates the occupancy of the given cells and repairs the floor field
+        :param cells_x:     Row ids of the cells whose occupancy might have changed
+        :param cells_y:     Column ids of the cells whose occupancy might have changed
+        :param occupied:    New occupancy of the given cells
+        :return:            None
+        """
+        dist, parent = self._dist, self._parent
+        occupied_cells = []
+        freed_cells = []
+        for x, y, is_occupied in zip(cells_x.tolist(), cells_y.tolist(), occupied.tolist()):
+            idx = self._to_index(x, y)
+            if self._occupied[idx] == is_occupied:
+                continue
+            self._occupied[idx] = is_occupied
+            self._extra_cost[idx] = self._static_cost[idx] + (self.DENSITY_COST if is_occupied else .0)
+            if idx in self._sources or self._blocked[idx]:
+                continue
+            (occupied_cells if is_occupied else freed_cells).append(idx)
+        if not occupied_cells and not freed_cells:
+            return
+
+        # invalidate the subtrees of the cells getting more expensive in the shortest path tree
+        max_invalidated = self.RECOMPUTE_RATIO * self._shape[0] * self._shape[1]
+        invalidated = set(occupied_cells)
+        stack = list(occupied_cells)
+        while stack:
+            idx = stack.pop()
+            for offset, _ in self._neighbours:
+                child = idx + offset
+                if parent[child] == idx and child not in invalidated:
+                    invalidated.add(child)
+                    stack.append(child)
+            if len(invalidated) > max_invalidated:
+                self._recompute()
+                return
+        for idx in invalidated:
+            dist[idx] = float("inf")
+            parent[idx] = -1
+
+        # restart from the best valid neighbour of the invalidated cells and the cells getting cheaper
+        changed = set(invalidated)
+        heap = []
+        for idx in invalidated.union(freed_cells):
+            best_dist, best_parent = dist[idx], parent[idx]
+            for offset, dir_cost in self._neighbours:
+                new_dist = dist[idx + offset] + dir_cost + self._extra_cost[idx]
+                if new_dist < best_dist:
+                    best_dist, best_parent = new_dist, idx + offset
+            if best_dist < dist[idx] or idx in invalidated:
+                dist[idx], parent[idx] = best_dist, best_parent
+                changed.add(idx)
+                if best_dist < float("inf"):
+                    heap.append((best_dist, idx))
+        heapq.heapify(heap)
+        self._propagate(heap, changed)
+
+        # write the changes back and re-sort the directions of the changed cells and their neighbours
+        changed = np.fromiter(changed, dtype=np.int64, count=len(changed))
+        self.dist_to_target[changed // self._width - 1, changed % self._width - 1] = [dist[idx] for idx in changed]
+        affected = np.unique((changed[:, None] + self._region_offsets).ravel())
+        affected_x, affected_y = affected // self._width - 1, affected % self._width - 1
+        is_inside = (affected_x >= 0) & (affected_x < self._shape[0]) & (affected_y >= 0) & (affected_y < self._shape[1])
+        affected_x, affected_y = affected_x[is_inside], affected_y[is_inside]
+        self.best_directions[affected_x, affected_y] = compute_best_directions_at(self.dist_to_target, affected_x,
+                                                                                  affected_y, self.sim_conf)
@@ -1,12 +1,13 @@
 import json
 
+import numpy as np
 import pygame
 import random
 import os
-import shutil
 
 from cell import Cell
 from pedestrian import Pedestrian
+from recorder import FrameRecorder, colors_to_pixels
 from target import Target
 from pygame_conf import PygameConfiguration
 from state import State
@@ -17,17 +18,24 @@ class Grid:
     Class representing the grid object
     Attributes:
         n_screenshot:   Number of screenshots taken of the simulation
+        recorder:       Recorder writing the screenshots in the background, created with the first screenshot
         pedestrians:    Stores pedestrians with their positions
         cells:          List where the Cell objects are stored
-        TARGET_CELL:    The (only) target cell object
+        TARGET_CELLS:   The target cell objects
+        TARGET_CELL:    The first target cell object, i.e. the only one in single-target scenarios
+        colors:         3D array storing the RGB colors of the cells as they are drawn on the screen
     """
 
+    # ratio of the changed cells to all cells above which the whole screen is redrawn at once
+    FULL_REDRAW_RATIO = .1
+
     def __init__(self):
 
         # fetch singleton object
         pygame_conf = PygameConfiguration.instance()
         grid_configuration = pygame_conf.GRID
         self.n_screenshot = 0
+        self.recorder = None
 
         self.cells = []
         for row in range(pygame_conf.N_ROW):
@@ -38,11 +46,13 @@ class Grid:
             self.cells.append(row_cells)
 
         self.pedestrians = []
+        # seeded random number generator, so that the track colors are the same in every run and replay
+        rng = random.Random(pygame_conf.SEED)
         # read the pedestrian attributes from config then process them
         for pedestrian_id, pedestrian_position in enumerate(grid_configuration['PEDESTRIANS']):
             pedestrian_x, pedestrian_y, pedestrian_speed = tuple(pedestrian_position)
             # set a random color for the track which pedestrian is going to form
-            color = tuple(random.randint(0, 255) for _ in range(3))
+            color = tuple(rng.randint(0, 255) for _ in range(3))
             new_pedestrian = Pedestrian((pedestrian_x, pedestrian_y), pedestrian_id, color, float(pedestrian_speed))
             self.pedestrians.append(new_pedestrian)
             self.cells[pedestrian_x][pedestrian_y].set_state(State.PEDESTRIAN)
@@ -56,44 +66,78 @@ class Grid:
                     for obstacle_y in range(rect_top_left_y, rect_bottom_right_y+1):
                         self.cells[obstacle_x][obstacle_y].set_state(State.OBSTACLE)
 
-        # specify target cell in the grid
-        target_x, target_y = tuple(grid_configuration['TARGET'])
-        self.cells[target_x][target_y].set_state(State.TARGET)
-        self.TARGET_CELL = Target((target_x, target_y))
+        # specify target cells in the grid
+        self.TARGET_CELLS = []
+        for target_x, target_y in pygame_conf.TARGETS:
+            self.cells[target_x][target_y].set_state(State.TARGET)
+            self.TARGET_CELLS.append(Target((target_x, target_y)))
+        self.TARGET_CELL = self.TARGET_CELLS[0]
+        self.colors = np.zeros((pygame_conf.N_ROW, pygame_conf.N_COL, 3), dtype=np.uint8)
+
+    def get_target_cell(self, position):
+        """
+        Finds the target cell object at the given position
+        :param position:    Coordinates of the target cell
+        :return:            The target cell object
+        """
+        for target_cell in self.TARGET_CELLS:
+            if target_cell.INIT_POINTS == position:
+                return target_cell
 
-    def draw_grid(self, screenshot: bool = False):
+    def draw_grid(self, screenshot: bool = False, changed_positions: set = None):
         """
-        Initiates pygame then displays the grid on the screen using pygame
-        :param screenshot:  The flag used to take a screenshot of the grid or not
-        :return:            None
+        Initiates pygame then displays the grid on the screen using pygame. Only the changed cells are redrawn and
+        updated on the screen, unless there are too many of them
+        :param screenshot:          The flag used to take a screenshot of the grid or not
+        :param changed_positions:   Positions of the cells changed since the last call, None to redraw all cells
+        :return:                    None
         """
         pygame_conf = PygameConfiguration.instance()
-        for row in range(pygame_conf.N_ROW):
-            for col in range(pygame_conf.N_COL):
-                cur_cell = self.cells[row][col]
-                x, y = cur_cell.INIT_POINTS
-                rect = pygame.Rect(y, x, pygame_conf.CELL_SIZE_BY_ROW, pygame_conf.CELL_SIZE_BY_COL)
-                if cur_cell.state is State.VISITED:
-                    pygame.draw.rect(pygame_conf.SCREEN, cur_cell.color, rect)
-                else:
-                    pygame.draw.rect(pygame_conf.SCREEN, cur_cell.color.value, rect)
-        pygame.display.update()
+        if changed_positions is None:
+            changed_positions = [(row, col) for row in range(pygame_conf.N_ROW) for col in range(pygame_conf.N_COL)]
+        for row, col in changed_positions:
+            cur_cell = self.cells[row][col]
+            self.colors[row, col] = cur_cell.color if cur_cell.state is State.VISITED else cur_cell.color.value
+
+        if len(changed_positions) > self.FULL_REDRAW_RATIO * pygame_conf.N_ROW * pygame_conf.N_COL:
+            self.blit_colors()
+            pygame.display.update()
+        else:
+            rects = []
+            for row, col in changed_positions:
+                x, y = self.cells[row][col].INIT_POINTS
+                rect = pygame.Rect(y, x, pygame_conf.CELL_SIZE_BY_COL, pygame_conf.CELL_SIZE_BY_ROW)
+                pygame.draw.rect(pygame_conf.SCREEN, self.colors[row, col].tolist(), rect)
+                rects.append(rect)
+            pygame.display.update(rects)
         if screenshot:
             self.take_screenshot()
 
+    def blit_colors(self):
+        """
+        Draws all cells on the screen at once by scaling the colors of the cells to pixels
+        :return:    None
+        """
+        pygame_conf = PygameConfiguration.instance()
+        pygame.surfarray.blit_array(pygame_conf.SCREEN, colors_to_pixels(self.colors, pygame_conf))
+
     def take_screenshot(self):
         """
-        Takes the screenshot of the grid
+        Takes the screenshot of the grid. It is handed to the recorder, which writes it in the background
         :return:    None
         """
         pygame_conf = PygameConfiguration.instance()
-        cwd = os.getcwd()
-        dir_path = os.path.join(cwd, "img", pygame_conf.SS_FOLDER_NAME)
-        if self.n_screenshot == 0:
-            if os.path.exists(dir_path):
-                shutil.rmtree(dir_path)
-            os.makedirs(dir_path)
+        if self.recorder is None:
+            dir_path = os.path.join(os.getcwd(), "img", pygame_conf.SS_FOLDER_NAME)
+            self.recorder = FrameRecorder(pygame_conf, dir_path, pygame_conf.SS_ARCHIVE)
         self.n_screenshot += 1
-        img_name = "img_" + str(self.n_screenshot) + ".jpg"
-        img_path = os.path.join(dir_path, img_name)
-        pygame.image.save(pygame_conf.SCREEN, img_path)
+        self.recorder.add_frame(self.colors)
+
+    def stop_recording(self):
+        """
+        Waits until all screenshots are written
+        :return:    None
+        """
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
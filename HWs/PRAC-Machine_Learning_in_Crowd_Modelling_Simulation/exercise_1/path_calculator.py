@@ -1,8 +1,11 @@
+import numpy as np
+
 from grid import Grid
 from state import State
-from path import Path
 from direction import Direction
-from queue import PriorityQueue
+from distance_field import DIR_X, DIR_Y, compute_best_directions, compute_distance_fields, get_direction_costs
+from field_cache import DistanceFieldCache
+from floor_field import DynamicFloorField
 from pygame_conf import PygameConfiguration
 
 
@@ -11,73 +14,43 @@ class PathCalculator:
     Class for calculation of shortest path
 
     Attributes:
-        grid:           Grid to be controlled
-        visited:        2D array to store the information that indicates if a cell is visited previously
-        dist_to_target: 2D array storing distance of cells to the target cell
-        all_best_paths: The best paths (adjacent cells) to follow to reach the target for all cells
-        DIRECTIONS:     2D array storing 8 possible directions (4 by row, 4 by column)
+        grid:               Grid to be controlled
+        visited:            2D array to store the information that indicates if a cell has a path to the target
+        dist_to_targets:    3D array storing distance of cells to each target cell
+        dist_to_target:     2D array storing distance of cells to the closest target cell, including the density costs
+                            if the dynamic floor field is active
+        floor_field:        The dynamic floor field updated by the occupancy changes, None if the field is static
+        best_directions:    3D array storing the ids of the best directions (adjacent cells) to follow to reach the
+                            target for all cells, sorted by the distance to the target and padded with NO_DIRECTION
+        DIRECTIONS:         2D array storing 8 possible directions (4 by row, 4 by column)
     """
 
     def __init__(self, grid: Grid):
         self.grid = grid
         self.visited = None
+        self.dist_to_targets = None
         self.dist_to_target = None
-        self.all_best_paths = None
+        self.best_directions = None
+        self.floor_field = None
+        self._is_obstacle = None
         pygame_conf = PygameConfiguration.instance()
-        self.DIRECTIONS = [Direction((1, 0), pygame_conf.DISTANCE_BY_ROW),
-                           Direction((-1, 0), pygame_conf.DISTANCE_BY_ROW),
-                           Direction((0, 1), pygame_conf.DISTANCE_BY_COL),
-                           Direction((0, -1), pygame_conf.DISTANCE_BY_COL),
-                           Direction((1, 1), pygame_conf.DISTANCE_BY_DIAG),
-                           Direction((1, -1), pygame_conf.DISTANCE_BY_DIAG),
-                           Direction((-1, 1), pygame_conf.DISTANCE_BY_DIAG),
-                           Direction((-1, -1), pygame_conf.DISTANCE_BY_DIAG)]
+        self.DIRECTIONS = [Direction((dir_x, dir_y), dir_cost) for dir_x, dir_y, dir_cost in
+                           zip(DIR_X.tolist(), DIR_Y.tolist(), get_direction_costs(pygame_conf).tolist())]
 
     def dijkstra(self):
         """
-        The dijkstra algorithm to find the distance between the target cell and all cells
+        The dijkstra algorithm to find the distance between the target cells and all cells
         :return: None
         """
         pygame_conf = PygameConfiguration.instance()
-        n_row, n_col = pygame_conf.N_ROW, pygame_conf.N_COL
-        obstacle_avoidance_flag = pygame_conf.OBSTACLE_AVOIDANCE_FLAG
-        obstacle_extra_cost = pygame_conf.OBSTACLE_EXTRA_COST
-        target_x, target_y = self.grid.TARGET_CELL.INIT_POINTS
-        heap = PriorityQueue()
-        heap.put((.0, target_x, target_y))
-
-        # initializations
-        self.visited = [[False for _ in range(n_col)] for _ in range(n_row)]
-        self.dist_to_target = [[float("inf") for _ in range(n_col)] for _ in range(n_row)]
-        self.dist_to_target[target_x][target_y] = .0
-
-        # dijkstra's implementation with priority queue
-        while not heap.empty():
-            dist, x, y = heap.get()
-            if self.visited[x][y]:
-                continue
-            self.visited[x][y] = True
-            for direction in self.DIRECTIONS:
-                new_x = x + direction.DIR_X
-                new_y = y + direction.DIR_Y
-                # check out of boundary case
-                if new_x < 0 or new_x >= n_row or new_y < 0 or new_y >= n_col:
-                    continue
-                # if a shortest path to the adjacent cell is already found, skip it
-                if self.visited[new_x][new_y]:
-                    continue
-                # if obstacle_avoidance flag is enabled and there is an obstacle at the adjacent cell, skip it
-                if obstacle_avoidance_flag and self.grid.cells[new_x][new_y].state == State.OBSTACLE:
-                    continue
-                new_dist = dist + direction.DIR_COST
-                # if obstacle_avoidance flag is disabled and there is an obstacle at the adjacent cell, add extra cost
-                if not obstacle_avoidance_flag and self.grid.cells[new_x][new_y].state == State.OBSTACLE:
-                    new_dist += obstacle_extra_cost
-                # if the path going through the current cell is not smaller than all the possible paths found, skip it
-                if new_dist >= self.dist_to_target[new_x][new_y]:
-                    continue
-                self.dist_to_target[new_x][new_y] = new_dist
-                heap.put((new_dist, new_x, new_y))
+        is_obstacle = np.array([[cell.state is State.OBSTACLE for cell in row_cells] for row_cells in self.grid.cells],
+                               dtype=bool)
+        targets = [target_cell.INIT_POINTS for target_cell in self.grid.TARGET_CELLS]
+        cache = DistanceFieldCache.from_configuration(pygame_conf)
+        self.dist_to_targets, self.dist_to_target = compute_distance_fields(is_obstacle, targets, pygame_conf, cache)
+        self._is_obstacle = is_obstacle
+        # the cells having a path to the target are exactly the ones visited by the dijkstra algorithm
+        self.visited = np.isfinite(self.dist_to_target)
 
     def find_best_adjacent_cells(self):
         """
@@ -85,26 +58,26 @@ class PathCalculator:
         :return: None
         """
         pygame_conf = PygameConfiguration.instance()
-        n_row, n_col = pygame_conf.N_ROW, pygame_conf.N_COL
-        self.all_best_paths = []
-        for x in range(n_row):
-            row_best_paths = []
-            for y in range(n_col):
-                best_paths = []
-                if self.visited[x][y]:
-                    for direction in self.DIRECTIONS:
-                        new_x = x + direction.DIR_X
-                        new_y = y + direction.DIR_Y
-                        # check out of boundary case
-                        if new_x < 0 or new_x >= n_row or new_y < 0 or new_y >= n_col:
-                            continue
-                        # if there is no path from the adjacent cell to the target cell, do not consider it
-                        if not self.visited[new_x][new_y]:
-                            continue
-                        path_dist = self.dist_to_target[new_x][new_y] + direction.DIR_COST
-                        new_path = Path(path_dist, direction)
-                        best_paths.append(new_path)
-                    # sort the directions to go (the adjacents to visit) based on the distance to the target cell
-                    best_paths.sort(key=lambda x: x.PATH_DIST)
-                row_best_paths.append(best_paths)
-            self.all_best_paths.append(row_best_paths)
+        if pygame_conf.DENSITY_COST is None:
+            self.best_directions = compute_best_directions(self.dist_to_target, pygame_conf)
+            return
+        targets = [target_cell.INIT_POINTS for target_cell in self.grid.TARGET_CELLS]
+        occupied = np.zeros(self._is_obstacle.shape, dtype=bool)
+        for pedestrian in self.grid.pedestrians:
+            occupied[pedestrian.position] = True
+        self.floor_field = DynamicFloorField(self._is_obstacle, targets, pygame_conf, occupied)
+        self.dist_to_target = self.floor_field.dist_to_target
+        self.best_directions = self.floor_field.best_directions
+
+    def update_occupancy(self, positions: list, occupied_positions: set):
+        """
+        Updates the dynamic floor field after the occupancy of the given positions might have changed
+        :param positions:           Positions whose occupancy might have changed
+        :param occupied_positions:  Currently occupied positions
+        :return:                    None
+        """
+        if self.floor_field is None or not positions:
+            return
+        cells_x, cells_y = np.array(positions, dtype=np.int64).T
+        occupied = np.array([position in occupied_positions for position in positions], dtype=bool)
+        self.floor_field.update(cells_x, cells_y, occupied)
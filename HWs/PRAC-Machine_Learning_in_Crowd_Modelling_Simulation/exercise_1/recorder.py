@@ -0,0 +1,146 @@
+import os
+import queue
+import shutil
+import threading
+import zipfile
+
+import numpy as np
+import pygame
+
+from sim_conf import SimulationConfiguration
+
+
+def colors_to_pixels(colors: np.ndarray, sim_conf: SimulationConfiguration):
+    """
+    Scales the colors of the cells to the pixels of the window
+    :param colors:      3D array storing the RGB colors of the cells
+    :param sim_conf:    Configuration of the simulation
+    :return:            3D array storing the RGB colors of the pixels indexed by (width, height) as in pygame.surfarray,
+                        the pixels not covered by the cells are left black
+    """
+    pixels = np.repeat(np.repeat(colors, sim_conf.CELL_SIZE_BY_ROW, axis=0), sim_conf.CELL_SIZE_BY_COL, axis=1)
+    screen_pixels = np.zeros((sim_conf.WINDOW_WIDTH, sim_conf.WINDOW_HEIGHT, 3), dtype=np.uint8)
+    screen_pixels[:pixels.shape[1], :pixels.shape[0]] = pixels.transpose(1, 0, 2)
+    return screen_pixels
+
+
+def load_frames(file_path: str):
+    """
+    Loads the frames recorded into an archive
+    :param file_path:   Path to the archive written by FrameRecorder
+    :return:            4D array storing the colors of the cells for each frame
+    """
+    with np.load(file_path) as archive:
+        return np.concatenate([archive[name] for name in sorted(archive.files)])
+
+
+class FrameRecorder:
+    """
+    Class representing a recorder writing the frames of the simulation in a background thread. The frames are the
+    colors of the cells, which are small compared to the screen, and they are handed to the thread through a bounded
+    queue. If the writer falls behind, adding a frame blocks until there is space in the queue, so that the memory usage
+    is bounded. The frames are written either as an image sequence (same as the former screenshots) or into a single
+    compressed archive, where each chunk of frames is an array entry
+    Attributes:
+        sim_conf:       Configuration of the simulation
+        FOLDER_PATH:    The folder the frames are written to
+        ARCHIVE:        The flag to write the frames into an archive instead of an image sequence
+        CHUNK_SIZE:     Number of frames stored in an array entry of the archive
+        n_frame:        Number of frames recorded
+    """
+
+    ARCHIVE_NAME = 'frames.npz'
+
+    def __init__(self, sim_conf: SimulationConfiguration, folder_path: str, archive: bool = False,
+                 queue_size: int = 64, chunk_size: int = 256):
+        """
+        Creates the folder of the frames and starts the writer thread
+        :param sim_conf:    Configuration of the simulation
+        :param folder_path: The folder the frames are written to, its previous content is removed
+        :param archive:     The flag to write the frames into an archive instead of an image sequence
+        :param queue_size:  Maximum number of frames waiting to be written
+        :param chunk_size:  Number of frames stored in an array entry of the archive
+        """
+        self.sim_conf = sim_conf
+        self.FOLDER_PATH = folder_path
+        self.ARCHIVE = archive
+        self.CHUNK_SIZE = chunk_size
+        self.n_frame = 0
+        if os.path.exists(folder_path):
+            shutil.rmtree(folder_path)
+        os.makedirs(folder_path)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._thread = threading.Thread(target=self._write_frames, daemon=True)
+        self._thread.start()
+
+    def add_frame(self, colors: np.ndarray):
+        """
+        Hands a frame to the writer thread, waits if the queue is full
+        :param colors:  3D array storing the RGB colors of the cells, it is copied
+        :return:        None
+        """
+        self._raise_error()
+        self.n_frame += 1
+        self._queue.put((self.n_frame, colors.copy()))
+
+    def close(self):
+        """
+        Waits until all frames are written and stops the writer thread
+        :return:    None
+        """
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError('Frames could not be written to {}'.format(self.FOLDER_PATH)) from self._error
+
+    def _write_frames(self):
+        """
+        Writes the frames in the queue until the recorder is closed
+        :return:    None
+        """
+        archive = None
+        chunk = []
+        frame_id = 0
+        is_closed = False
+        try:
+            if self.ARCHIVE:
+                archive = zipfile.ZipFile(os.path.join(self.FOLDER_PATH, self.ARCHIVE_NAME), 'w',
+                                          compression=zipfile.ZIP_DEFLATED)
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    is_closed = True
+                    break
+                frame_id, colors = item
+                if archive is None:
+                    self._write_image(frame_id, colors)
+                    continue
+                chunk.append(colors)
+                if len(chunk) == self.CHUNK_SIZE:
+                    self._write_chunk(archive, frame_id, chunk)
+                    chunk = []
+            if chunk:
+                self._write_chunk(archive, frame_id, chunk)
+        except Exception as error:
+            self._error = error
+            # keep consuming the queue, so that the simulation is never blocked by a failed writer
+            while not is_closed:
+                is_closed = self._queue.get() is None
+        finally:
+            if archive is not None:
+                archive.close()
+
+    def _write_image(self, frame_id: int, colors: np.ndarray):
+        surface = pygame.surfarray.make_surface(colors_to_pixels(colors, self.sim_conf))
+        img_name = "img_" + str(frame_id) + ".jpg"
+        pygame.image.save(surface, os.path.join(self.FOLDER_PATH, img_name))
+
+    @staticmethod
+    def _write_chunk(archive: zipfile.ZipFile, last_frame_id: int, chunk: list):
+        # entries are named by their first frame id, zero padded so that they are sorted by name
+        with archive.open('frames_{:09d}.npy'.format(last_frame_id - len(chunk) + 1), 'w') as f:
+            np.lib.format.write_array(f, np.stack(chunk))
@@ -0,0 +1,91 @@
+import json
+import math
+
+
+class SimulationConfiguration:
+    """
+    Class representing the simulation configuration without any display related setup. They are populated via a file
+    in the format of `pygame_configuration.json`
+    Attributes:
+        FILE_PATH:                  Path to the configuration file the attributes are populated from
+        WINDOW_WIDTH:               Pixel-based width of the window for pygame
+        WINDOW_HEIGHT:              Pixel-based height of the window for pygame
+        N_ROW:                      Number of rows in the grid
+        N_COL:                      Number of columns in the grid
+        CELL_SIZE_BY_ROW:           Pixel-based height of the cell
+        CELL_SIZE_BY_COL:           Pixel-based width of the cell
+        DISTANCE_BY_ROW:            Distance between two not-diagonally adjacent rows
+        DISTANCE_BY_COL:            Distance between two not-diagonally adjacent columns
+        DISTANCE_BY_DIAG:           Distance between two diagonally adjacent rows
+        OBSTACLE_AVOIDANCE_FLAG:    The flag that indicates the pedestrian behavior. Obstacle will be avoided if set as 1
+        OBSTACLE_EXTRA_COST:        Cost to be used during computation of the best paths
+        STOP_DISPLAY_AFTER_STUCK:   The flag that finishes the display for the pedestrians who got stuck
+        DISPLAY_DELTA_TIMESTAMP:    The time difference between consecutive displays
+        END_FREEZE:                 The number of seconds to wait at the end of the simulation
+        SS_FOLDER_NAME:             The folder name under img directory to save the screenshots of the simulation
+        SS_START:                   The flag used to take a screenshot of the initial grid
+        SS_FINAL:                   The flag used to take a screenshot of the final grid
+        SS_PERIOD:                  The period used to take screenshots of the grid periodically, put 0 otherwise
+        SS_ARCHIVE:                 The flag to record the screenshots into a single archive instead of image files
+        GRID:                       Field containing pedestrian, obstacle (optional) and target coordinates.
+        TARGETS:                    Coordinates of the target cells, given by either TARGET or TARGETS field of GRID
+        STEP_LIMIT:                 Upper bound to limit move count
+        CACHE_FOLDER_NAME:          The folder to cache the distance fields in, None if caching is not active
+        SEED:                       Seed of the random number generator of the track colors, None to not seed it
+        EVENT_LOG_FILE_NAME:        The file to save the event log of the simulation to, None if it is not saved
+        DENSITY_COST:               Extra cost of entering an occupied cell in the dynamic floor field, None if the
+                                    static floor field is used
+    """
+
+    def __init__(self, file_path: str = 'pygame_configuration.json'):
+        """
+        Populate attributes via a file
+        :param file_path:   Path to the configuration file
+        """
+        with open(file_path) as f:
+            parameters = json.load(f)
+        self.FILE_PATH = file_path
+        window_size = parameters["WINDOW_SIZE"]
+        self.WINDOW_WIDTH = window_size['WINDOW_WIDTH']
+        self.WINDOW_HEIGHT = window_size['WINDOW_HEIGHT']
+        grid_size = parameters["GRID_SIZE"]
+        self.N_ROW = grid_size['N_ROW']
+        self.N_COL = grid_size['N_COL']
+        self.CELL_SIZE_BY_ROW = self.WINDOW_HEIGHT // self.N_ROW
+        self.CELL_SIZE_BY_COL = self.WINDOW_WIDTH // self.N_COL
+        cell_distance = parameters["CELL_DISTANCE"]
+        self.DISTANCE_BY_ROW = float(cell_distance['DISTANCE_BY_ROW'])
+        self.DISTANCE_BY_COL = float(cell_distance['DISTANCE_BY_COL'])
+        self.DISTANCE_BY_DIAG = math.sqrt(self.DISTANCE_BY_ROW ** 2 + self.DISTANCE_BY_COL ** 2)
+        obstacle_flags = parameters["OBSTACLE_FLAGS"]
+        self.OBSTACLE_AVOIDANCE_FLAG = obstacle_flags['OBSTACLE_AVOIDANCE_FLAG']
+        self.OBSTACLE_EXTRA_COST = float(obstacle_flags['OBSTACLE_EXTRA_COST'])
+        display = parameters["DISPLAY"]
+        self.STOP_DISPLAY_AFTER_STUCK = display['STOP_DISPLAY_AFTER_STUCK']
+        self.DISPLAY_DELTA_TIMESTAMP = float(display['DISPLAY_DELTA_TIMESTAMP'])
+        self.END_FREEZE = float(display['END_FREEZE'])
+        screenshot = parameters['SCREENSHOT']
+        self.SS_FOLDER_NAME = screenshot['SS_FOLDER_NAME']
+        self.SS_START = screenshot['SS_START']
+        self.SS_FINAL = screenshot['SS_FINAL']
+        self.SS_PERIOD = screenshot['SS_PERIOD']
+        self.SS_ARCHIVE = screenshot.get('SS_ARCHIVE', False)
+        self.GRID = parameters['GRID']
+        if 'TARGETS' in self.GRID:
+            self.TARGETS = [tuple(target) for target in self.GRID['TARGETS']]
+        else:
+            self.TARGETS = [tuple(self.GRID['TARGET'])]
+        self.STEP_LIMIT = None
+        self.CACHE_FOLDER_NAME = None
+        self.DENSITY_COST = None
+        self.SEED = parameters.get('SEED')
+        self.EVENT_LOG_FILE_NAME = None
+
+        if parameters['STEP_LIMIT']['ACTIVE']:
+            self.STEP_LIMIT = parameters['STEP_LIMIT']['VALUE']
+        if 'CACHE' in parameters and parameters['CACHE']['ACTIVE']:
+            self.CACHE_FOLDER_NAME = parameters['CACHE']['FOLDER_NAME']
+        if 'EVENT_LOG' in parameters and parameters['EVENT_LOG']['ACTIVE']:
+            self.EVENT_LOG_FILE_NAME = parameters['EVENT_LOG']['FILE_NAME']
+        if 'DYNAMIC_FLOOR_FIELD' in parameters and parameters['DYNAMIC_FLOOR_FIELD']['ACTIVE']:
+            self.DENSITY_COST = float(parameters['DYNAMIC_FLOOR_FIELD']['DENSITY_COST'])
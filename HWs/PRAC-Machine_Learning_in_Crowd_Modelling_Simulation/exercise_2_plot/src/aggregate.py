@@ -0,0 +1,121 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from sim_conf import SimulationConfiguration
+from utils import file_to_count_df
+
+GROUP_COLUMNS = ['group-s', 'group-i', 'group-r']
+GROUP_NAMES = ['susceptible', 'infected', 'recovered']
+GROUP_COLORS = ['31, 119, 180', '214, 39, 40', '44, 160, 44']
+
+
+def count_folder(folder):
+    """
+    Computes the group counts of an output folder of vadere
+    :param folder: The path to output folder created after the simulation of vadere
+    :return: Group count DataFrame sorted by sim time, None if the folder has no SIR output
+    """
+    file_path = os.path.join(folder, "SIRinformation.csv")
+    if not os.path.exists(file_path):
+        print("DOES NOT EXIST: " + file_path)
+        return None
+    return file_to_count_df(file_path).sort_values('simTime', ignore_index=True)
+
+
+def resample_counts(group_counts, time_grid):
+    """
+    Resamples the group counts on the given sim times. The counts are constant between the sim times of the output,
+    hence the count at a sim time is the one at the last output sim time not after it (or the first one)
+    :param group_counts: Group count DataFrame sorted by sim time
+    :param time_grid: Sim times to resample the counts on
+    :return: 2D array storing the counts of the groups (columns) at the given sim times (rows)
+    """
+    ids = np.searchsorted(group_counts['simTime'].values, time_grid, side='right') - 1
+    return group_counts[GROUP_COLUMNS].values[np.maximum(ids, 0)]
+
+
+def get_run_names(folders):
+    """
+    Names the output folders by their paths relative to the common parent of the folders, so that folders with the
+    same name in different parents (e.g. output folders of different scenarios) are told apart
+    :param folders: The paths to output folders created after the simulations of vadere
+    :return: Names of the runs, in the order of the folders
+    """
+    folders = [os.path.abspath(folder) for folder in folders]
+    input_root = os.path.commonpath([os.path.dirname(folder) for folder in folders])
+    run_names = [os.path.relpath(folder, input_root) for folder in folders]
+    if len(set(run_names)) < len(run_names):
+        duplicates = sorted({run_name for run_name in run_names if run_names.count(run_name) > 1})
+        raise ValueError('The output folders are given more than once: {}'.format(', '.join(duplicates)))
+    return run_names
+
+
+def aggregate_folders(folders, n_time=500, quantiles=(.1, .9), max_workers=None):
+    """
+    Computes the group counts of the output folders in a process pool, then resamples them on a common time grid and
+    computes the mean and the quantiles of the counts over the runs
+    :param folders: The paths to output folders created after the simulations of vadere
+    :param n_time: Number of sim times in the common time grid
+    :param quantiles: Quantiles of the counts to be computed, e.g. the lower and upper limits of a band
+    :param max_workers: Number of worker processes, number of cores if None
+    :return: Results DataFrame storing the resampled counts of each run and the statistics, with a run column naming
+             the folder (by its path relative to the common parent of the folders) or the statistic (mean,
+             quantile_<q>)
+    """
+    run_names = get_run_names(folders)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        folder_counts = list(executor.map(count_folder, folders))
+    runs = [(run_name, group_counts)
+            for run_name, group_counts in zip(run_names, folder_counts) if group_counts is not None]
+    if not runs:
+        raise ValueError('None of the output folders has a SIR output')
+
+    start_time = min(group_counts['simTime'].iloc[0] for _, group_counts in runs)
+    end_time = max(group_counts['simTime'].iloc[-1] for _, group_counts in runs)
+    time_grid = np.linspace(start_time, end_time, n_time)
+    # 3D array storing the counts by run, sim time and group
+    counts = np.stack([resample_counts(group_counts, time_grid) for _, group_counts in runs])
+
+    statistics = [('mean', counts.mean(axis=0))]
+    statistics += [('quantile_{}'.format(q), np.quantile(counts, q, axis=0)) for q in quantiles]
+    results = []
+    for run, run_counts in [(run, counts[run_id]) for run_id, (run, _) in enumerate(runs)] + statistics:
+        run_results = pd.DataFrame(run_counts, columns=GROUP_COLUMNS)
+        run_results.insert(0, 'simTime', time_grid)
+        run_results.insert(0, 'run', run)
+        results.append(run_results)
+    return pd.concat(results, ignore_index=True)
+
+
+def create_aggregate_figure(results, quantiles=(.1, .9)):
+    """
+    Creates the figure of the mean counts of the groups with the band between the lowest and highest quantiles
+    :param results: Results DataFrame returned by aggregate_folders
+    :param quantiles: Quantiles computed by aggregate_folders
+    :return: Plotly figure
+    """
+    figure = go.Figure()
+    lower = results[results['run'] == 'quantile_{}'.format(min(quantiles))]
+    upper = results[results['run'] == 'quantile_{}'.format(max(quantiles))]
+    mean = results[results['run'] == 'mean']
+    for column, name, color in zip(GROUP_COLUMNS, GROUP_NAMES, GROUP_COLORS):
+        figure.add_trace(go.Scatter(x=lower['simTime'], y=lower[column], mode='lines', line=dict(width=0),
+                                    showlegend=False, hoverinfo='skip'))
+        figure.add_trace(go.Scatter(x=upper['simTime'], y=upper[column], mode='lines', line=dict(width=0),
+                                    fill='tonexty', fillcolor='rgba({}, 0.2)'.format(color),
+                                    name='{} {}-{} quantile'.format(name, min(quantiles), max(quantiles))))
+        figure.add_trace(go.Scatter(x=mean['simTime'], y=mean[column], mode='lines',
+                                    line=dict(color='rgb({})'.format(color)), name=name + ' mean'))
+    figure.update_layout(xaxis_title='simTime', yaxis_title='pedestrian count')
+    return figure
+
+
+if __name__ == '__main__':
+    sim_conf = SimulationConfiguration.instance()
+    aggregate_results = aggregate_folders(sim_conf.OUTPUT_FOLDER_PATHS, sim_conf.N_TIME, sim_conf.QUANTILES)
+    aggregate_results.to_csv(sim_conf.RESULTS_PATH, index=False)
+    create_aggregate_figure(aggregate_results, sim_conf.QUANTILES).write_image(sim_conf.FIGURE_PATH)
@@ -0,0 +1,52 @@
+import numpy as np
+
+
+def lttb(x, y, n_out, keep_extrema=False):
+    """
+    Downsamples a time series by the largest-triangle-three-buckets algorithm. The first and the last points are kept,
+    the other points are split into buckets, and from each bucket the point forming the largest triangle with the point
+    selected from the previous bucket and the average of the next bucket is selected. This follows the shape of the
+    curve, but a peak is only kept if its triangle is the largest in its bucket, so the extrema are not guaranteed to be
+    kept unless keep_extrema is set.
+    :param x: Sorted x values of the series
+    :param y: y values of the series
+    :param n_out: Maximum number of points to be kept
+    :param keep_extrema: If True, the points with the minimum and the maximum y of each bucket are kept besides the
+        selected one, so the points are split into (n_out - 2) // 3 buckets to keep at most n_out points (ignored if
+        n_out is less than 5)
+    :return: x and y values of the selected points
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    keep_extrema = keep_extrema and n_out >= 5
+    n_bucket = (n_out - 2) // 3 if keep_extrema else n_out - 2
+    if n_out >= n or n_bucket < 1:
+        return x, y
+
+    # bucket i covers the points edges[i]:edges[i + 1], and the last edge is the last point
+    every = (n - 2) / n_bucket
+    edges = (np.floor(np.arange(n_bucket + 1) * every) + 1).astype(np.int64)
+    edges = np.append(edges, n)
+
+    selected = np.empty(n_bucket + 2, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    extrema = np.empty(2 * n_bucket, dtype=np.int64)
+    a = 0
+    for bucket in range(n_bucket):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # twice the area of the triangles, the constant factor does not change the selection
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[bucket + 1] = a
+        if keep_extrema:
+            extrema[2 * bucket] = start + int(np.argmin(y[start:end]))
+            extrema[2 * bucket + 1] = start + int(np.argmax(y[start:end]))
+
+    if keep_extrema:
+        selected = np.unique(np.concatenate([selected, extrema]))
+    return x[selected], y[selected]
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+
+class GroupCountCache:
+    """
+    Class representing an on-disk cache of the group count DataFrames of the Vadere processor files. An entry is keyed
+    by the path of the file and the counting parameters, and it stores the fingerprint of the file: its size, mtime and
+    content hash. The content is hashed only if the size or the mtime has changed, so that a file copied or touched
+    without changes is not counted again, while unchanged files cost a single stat call
+    Attributes:
+        FOLDER_PATH:    The folder where the group count DataFrames are stored
+    """
+
+    def __init__(self, folder_path: str):
+        self.FOLDER_PATH = folder_path
+        os.makedirs(folder_path, exist_ok=True)
+
+    @classmethod
+    def from_configuration(cls, sim_conf):
+        """
+        Creates the cache given in the configuration
+        :param sim_conf: Configuration of the simulation
+        :return: The cache object, None if caching is not active
+        """
+        if sim_conf.RESULTS_CACHE_FOLDER is None:
+            return None
+        return cls(sim_conf.RESULTS_CACHE_FOLDER)
+
+    @staticmethod
+    def get_content_hash(file_path: str, block_size: int = 1 << 20):
+        """
+        Computes the hash of the content of a file block by block
+        :param file_path: Path to the file
+        :param block_size: Number of bytes to be read at once
+        :return: Hexadecimal hash of the content
+        """
+        content_hash = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                content_hash.update(block)
+        return content_hash.hexdigest()
+
+    def _get_entry_path(self, file_path: str, parameters: tuple):
+        key = hashlib.sha256(repr((os.path.abspath(file_path), parameters)).encode()).hexdigest()
+        return os.path.join(self.FOLDER_PATH, key)
+
+    def get_count_df(self, file_path: str, parameters: tuple, compute_count_df):
+        """
+        Retrieves the group count DataFrame of a file from the cache, or computes and caches it if the file is new or
+        changed
+        :param file_path: Path to the Vadere processor file
+        :param parameters: Parameters the group counts depend on other than the file, e.g. the group ids
+        :param compute_count_df: Function computing the group count DataFrame of the file
+        :return: Group count DataFrame
+        """
+        entry_path = self._get_entry_path(file_path, parameters)
+        stat = os.stat(file_path)
+        fingerprint = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        entry = None
+        if os.path.exists(entry_path + '.json') and os.path.exists(entry_path + '.pkl'):
+            with open(entry_path + '.json') as f:
+                entry = json.load(f)
+            if entry['size'] == fingerprint['size'] and entry['mtime'] == fingerprint['mtime']:
+                return pd.read_pickle(entry_path + '.pkl')
+
+        fingerprint['content_hash'] = self.get_content_hash(file_path)
+        if entry is not None and entry['content_hash'] == fingerprint['content_hash']:
+            group_counts = pd.read_pickle(entry_path + '.pkl')
+        else:
+            group_counts = compute_count_df()
+            self._write(entry_path + '.pkl', lambda f: group_counts.to_pickle(f))
+        self._write(entry_path + '.json', lambda f: f.write(json.dumps(fingerprint).encode()))
+        return group_counts
+
+    def _write(self, file_path: str, write):
+        # the file is written under a temporary name and then renamed, so that a partially written entry is never read
+        fd, tmp_path = tempfile.mkstemp(dir=self.FOLDER_PATH, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, file_path)
@@ -11,6 +11,13 @@ class SimulationConfiguration:
         OUTPUT_FOLDER_PATHS:        Path to output folders of the simulation software called vadere
         CSV_GROUP_ID_COLUMN_NAME:   Column name in the output csv file for group id of pedestrians
         FIGURE_PATH                 The path to save resulting plot of SIR groups
+        CHUNK_SIZE:                 Number of rows to be read at once from the output csv files
+        CACHE_FORMAT:               Format (parquet or feather) to cache the parsed csv files in, None to not cache
+        RESULTS_PATH:               The path to save the aggregated SIR counts of the output folders
+        N_TIME:                     Number of sim times in the common time grid the SIR counts are resampled on
+        QUANTILES:                  Quantiles of the SIR counts over the output folders, e.g. the limits of a band
+        RESULTS_CACHE_FOLDER:       The folder to cache the SIR counts of the output csv files in, None to not cache
+        PLOT_POINT_COUNT:           Number of points each SIR curve is downsampled to for plotting, None to plot all
     """
 
     def __init__(self):
@@ -21,4 +28,11 @@ class SimulationConfiguration:
             parameters = json.load(f)
         self.OUTPUT_FOLDER_PATHS = parameters["OUTPUT_FOLDER_PATHS"]
         self.CSV_GROUP_ID_COLUMN_NAME = parameters["CSV_GROUP_ID_COLUMN_NAME"]
-        self.FIGURE_PATH = parameters["FIGURE_PATH"]
\ No newline at end of file
+        self.FIGURE_PATH = parameters["FIGURE_PATH"]
+        self.CHUNK_SIZE = parameters.get("CHUNK_SIZE", 1000000)
+        self.CACHE_FORMAT = parameters.get("CACHE_FORMAT")
+        self.RESULTS_PATH = parameters.get("RESULTS_PATH", "results.csv")
+        self.N_TIME = parameters.get("N_TIME", 500)
+        self.QUANTILES = parameters.get("QUANTILES", [0.1, 0.9])
+        self.RESULTS_CACHE_FOLDER = parameters.get("RESULTS_CACHE_FOLDER")
+        self.PLOT_POINT_COUNT = parameters.get("PLOT_POINT_COUNT")
\ No newline at end of file
@@ -0,0 +1,176 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+# narrow dtypes of the columns used from the Vadere processor file
+PEDESTRIAN_ID_DTYPE = np.int32
+SIM_TIME_DTYPE = np.float32
+GROUP_ID_DTYPE = np.int8
+
+# file extensions of the supported cache formats
+CACHE_EXTENSIONS = {
+    'parquet': '.parquet',
+    'feather': '.feather'
+}
+
+
+class GroupCounter:
+    """
+    Class counting the pedestrians in the SIR groups incrementally, so that the Vadere processor file can be processed
+    chunk by chunk. Each pedestrian starts as susceptible, gets infected at the first row with ID_INFECTED and recovers
+    at the first later row with ID_RECOVERED. Only the transitions of the pedestrians are kept in memory
+    Attributes:
+        ID_INFECTED:    The group id of the infected pedestrians
+        ID_RECOVERED:   The group id of the recovered pedestrians
+        n_row:          Number of rows processed
+    """
+
+    def __init__(self, ID_INFECTED=1, ID_RECOVERED=2):
+        self.ID_INFECTED = ID_INFECTED
+        self.ID_RECOVERED = ID_RECOVERED
+        self.n_row = 0
+        self._pedestrian_ids = pd.Index([])
+        self._sim_times = []
+        self._infection_rows = pd.Series([], dtype=np.int64)
+        self._infection_times = []
+        self._recovery_rows = pd.Series([], dtype=np.int64)
+        self._recovery_times = []
+
+    def update(self, pedestrian_ids: np.ndarray, sim_times: np.ndarray, group_ids: np.ndarray):
+        """
+        Processes the next rows of the file
+        :param pedestrian_ids:  Pedestrian ids of the rows
+        :param sim_times:       Sim times of the rows
+        :param group_ids:       Group ids of the rows
+        :return:                None
+        """
+        rows = np.arange(self.n_row, self.n_row + len(pedestrian_ids))
+        self._pedestrian_ids = self._pedestrian_ids.union(pd.unique(pedestrian_ids))
+        self._sim_times.append(pd.unique(sim_times))
+
+        # the first infection of the pedestrians not infected in the previous rows
+        is_infected = group_ids == self.ID_INFECTED
+        infections = pd.Series(rows[is_infected], index=pedestrian_ids[is_infected]).groupby(level=0).min()
+        infections = infections[~infections.index.isin(self._infection_rows.index)]
+        self._infection_rows = pd.concat([self._infection_rows, infections])
+        self._infection_times.append(sim_times[infections.values - self.n_row])
+
+        # the first recovery of the pedestrians after their infection
+        is_recovered = group_ids == self.ID_RECOVERED
+        recovered_ids, recovered_rows = pedestrian_ids[is_recovered], rows[is_recovered]
+        infection_rows = self._infection_rows.reindex(recovered_ids).values
+        is_recovering = (recovered_rows > infection_rows) & ~np.isin(recovered_ids, self._recovery_rows.index)
+        recoveries = pd.Series(recovered_rows[is_recovering], index=recovered_ids[is_recovering])
+        recoveries = recoveries.groupby(level=0).min()
+        self._recovery_rows = pd.concat([self._recovery_rows, recoveries])
+        self._recovery_times.append(sim_times[recoveries.values - self.n_row])
+
+        self.n_row += len(pedestrian_ids)
+
+    def to_count_df(self):
+        """
+        Converts the processed rows to a group count DataFrame that can be plotted. A pedestrian is counted in the new
+        group for the sim times strictly after the transition, hence the counts are found by searching the sorted
+        transition times
+        :return: Group count DataFrame
+        """
+        sim_times = pd.unique(np.concatenate(self._sim_times)) if self._sim_times else np.array([])
+        infection_times = np.sort(np.concatenate(self._infection_times)) if self._infection_times else np.array([])
+        recovery_times = np.sort(np.concatenate(self._recovery_times)) if self._recovery_times else np.array([])
+
+        # number of transitions happened strictly before each sim time
+        n_infected = np.searchsorted(infection_times, sim_times, side='left')
+        n_recovered = np.searchsorted(recovery_times, sim_times, side='left')
+
+        group_counts = pd.DataFrame(columns=['simTime', 'group-s', 'group-i', 'group-r'])
+        group_counts['simTime'] = sim_times
+        group_counts['group-s'] = np.where(sim_times >= 0, len(self._pedestrian_ids), 0) - n_infected
+        group_counts['group-i'] = n_infected - n_recovered
+        group_counts['group-r'] = n_recovered
+        group_counts[['group-s', 'group-i', 'group-r']] = group_counts[['group-s', 'group-i', 'group-r']].astype(np.int64)
+        return group_counts
+
+
+def get_cache_path(file_path: str, cache_format: str):
+    """
+    Finds the path of the cached table of a Vadere processor file
+    :param file_path:       Path to the Vadere processor file
+    :param cache_format:    Format of the cache, either parquet or feather
+    :return:                Path to the cache file next to the processor file
+    """
+    if cache_format not in CACHE_EXTENSIONS:
+        raise ValueError('Unknown cache format: {}'.format(cache_format))
+    return os.path.splitext(file_path)[0] + CACHE_EXTENSIONS[cache_format]
+
+
+def read_sir_chunks(file_path: str, group_id_column_name: str, chunk_size: int, cache_format: str = None):
+    """
+    Reads the pedestrian ids, sim times and group ids from a Vadere processor file chunk by chunk with narrow dtypes.
+    If a cache format is given, the parsed table is written to the cache while reading, and it is read from the cache
+    instead of the file if the cache is newer than the file
+    :param file_path:               Path to the space delimited Vadere processor file
+    :param group_id_column_name:    Column name of the group ids in the file
+    :param chunk_size:              Number of rows to be read at once
+    :param cache_format:            Format of the cache, either parquet or feather, None to not cache the table
+    :return:                        Generator of the DataFrames of the chunks
+    """
+    columns = ['pedestrianId', 'simTime', group_id_column_name]
+    if cache_format is None:
+        yield from _read_csv_chunks(file_path, columns, chunk_size)
+        return
+    if pa is None:
+        raise ImportError('pyarrow is required to cache the Vadere processor files')
+
+    cache_path = get_cache_path(file_path, cache_format)
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(file_path):
+        yield from _read_cache_chunks(cache_path, cache_format, chunk_size)
+        return
+
+    # the cache is written under a temporary name, so that an interrupted run does not leave a partial cache
+    tmp_path = cache_path + '.tmp'
+    writer = None
+    is_completed = False
+    try:
+        for chunk in _read_csv_chunks(file_path, columns, chunk_size):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                if cache_format == 'parquet':
+                    writer = pa.parquet.ParquetWriter(tmp_path, table.schema)
+                else:
+                    writer = pa.ipc.new_file(tmp_path, table.schema)
+            writer.write_table(table)
+            yield chunk
+        is_completed = True
+    finally:
+        if writer is not None:
+            writer.close()
+            if is_completed:
+                os.replace(tmp_path, cache_path)
+            else:
+                os.remove(tmp_path)
+
+
+def _read_csv_chunks(file_path: str, columns: list, chunk_size: int):
+    dtype = dict(zip(columns, [PEDESTRIAN_ID_DTYPE, SIM_TIME_DTYPE, GROUP_ID_DTYPE]))
+    with pd.read_csv(file_path, delimiter=" ", usecols=columns, dtype=dtype, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            yield chunk[columns]
+
+
+def _read_cache_chunks(cache_path: str, cache_format: str, chunk_size: int):
+    if cache_format == 'parquet':
+        for batch in pa.parquet.ParquetFile(cache_path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        with pa.memory_map(cache_path) as source:
+            reader = pa.ipc.open_file(source)
+            for batch_id in range(reader.num_record_batches):
+                yield reader.get_batch(batch_id).to_pandas()
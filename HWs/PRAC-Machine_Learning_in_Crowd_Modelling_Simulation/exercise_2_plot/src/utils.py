@@ -1,8 +1,10 @@
 import os
-import pandas as pd
 import plotly.graph_objects as go
 
+from decimation import lttb
+from results_cache import GroupCountCache
 from sim_conf import SimulationConfiguration
+from sir_reader import GroupCounter, read_sir_chunks
 
 
 def file_df_to_count_df(df,
@@ -16,30 +18,36 @@ def file_df_to_count_df(df,
     sim_conf = SimulationConfiguration.instance()
     csv_group_id_column_name = sim_conf.CSV_GROUP_ID_COLUMN_NAME
 
-    pedestrian_ids = df['pedestrianId'].unique()
-    sim_times = df['simTime'].unique()
-    group_counts = pd.DataFrame(columns=['simTime', 'group-s', 'group-i', 'group-r'])
-    group_counts['simTime'] = sim_times
-    group_counts['group-s'] = 0
-    group_counts['group-i'] = 0
-    group_counts['group-r'] = 0
+    group_counter = GroupCounter(ID_INFECTED=ID_INFECTED, ID_RECOVERED=ID_RECOVERED)
+    group_counter.update(df['pedestrianId'].values, df['simTime'].values, df[csv_group_id_column_name].values)
+    return group_counter.to_count_df()
 
-    for pid in pedestrian_ids:
-        simtime_group = df[df['pedestrianId'] == pid][['simTime', csv_group_id_column_name]].values
-        current_state = ID_SUSCEPTIBLE
-        group_counts.loc[group_counts['simTime'] >= 0, 'group-s'] += 1
-        for (st, g) in simtime_group:
-            if g != current_state:
-                if g == ID_INFECTED and current_state == ID_SUSCEPTIBLE:
-                    current_state = g
-                    group_counts.loc[group_counts['simTime'] > st, 'group-s'] -= 1
-                    group_counts.loc[group_counts['simTime'] > st, 'group-i'] += 1
-                elif g == ID_RECOVERED and current_state == ID_INFECTED:
-                    current_state = g
-                    group_counts.loc[group_counts['simTime'] > st, 'group-i'] -= 1
-                    group_counts.loc[group_counts['simTime'] > st, 'group-r'] += 1
-                    break
-    return group_counts
+
+def file_to_count_df(file_path,
+                     ID_SUSCEPTIBLE=0,
+                     ID_INFECTED=1,
+                     ID_RECOVERED=2):
+    """
+    Converts the Vadere processor file to a group count DataFrame that can be plotted, reading the file chunk by chunk
+    so that the whole file is never loaded into memory.
+    The ID_SUSCEPTIBLE, ID_INFECTED and ID_RECOVERED specify which ids the groups have in the Vadere processor file.
+    """
+    sim_conf = SimulationConfiguration.instance()
+    csv_group_id_column_name = sim_conf.CSV_GROUP_ID_COLUMN_NAME
+
+    def compute_count_df():
+        group_counter = GroupCounter(ID_INFECTED=ID_INFECTED, ID_RECOVERED=ID_RECOVERED)
+        for chunk in read_sir_chunks(file_path, csv_group_id_column_name, sim_conf.CHUNK_SIZE, sim_conf.CACHE_FORMAT):
+            group_counter.update(chunk['pedestrianId'].values, chunk['simTime'].values,
+                                 chunk[csv_group_id_column_name].values)
+        return group_counter.to_count_df()
+
+    # only the new or changed files are counted if the results are cached
+    cache = GroupCountCache.from_configuration(sim_conf)
+    if cache is None:
+        return compute_count_df()
+    parameters = (csv_group_id_column_name, ID_SUSCEPTIBLE, ID_INFECTED, ID_RECOVERED)
+    return cache.get_count_df(file_path, parameters, compute_count_df)
 
 
 def create_folder_data_scatter(folder):
@@ -52,26 +60,26 @@ def create_folder_data_scatter(folder):
     if not os.path.exists(file_path):
         print("DOES NOT EXIST")
         return None
-    data = pd.read_csv(file_path, delimiter=" ")
 
     ID_SUSCEPTIBLE = 0
     ID_INFECTED = 1
     ID_RECOVERED = 2
     # ID_REMOVED = 3
 
-    group_counts = file_df_to_count_df(data, ID_INFECTED=ID_INFECTED, ID_SUSCEPTIBLE=ID_SUSCEPTIBLE,
-                                       ID_RECOVERED=ID_RECOVERED)
+    group_counts = file_to_count_df(file_path, ID_INFECTED=ID_INFECTED, ID_SUSCEPTIBLE=ID_SUSCEPTIBLE,
+                                    ID_RECOVERED=ID_RECOVERED)
     # group_counts.plot()
-    scatter_s = go.Scatter(x=group_counts['simTime'],
-                           y=group_counts['group-s'],
-                           name='susceptible ' + os.path.basename(folder),
-                           mode='lines')
-    scatter_i = go.Scatter(x=group_counts['simTime'],
-                           y=group_counts['group-i'],
-                           name='infected ' + os.path.basename(folder),
-                           mode='lines')
-    scatter_r = go.Scatter(x=group_counts['simTime'],
-                           y=group_counts['group-r'],
-                           name='recovered ' + os.path.basename(folder),
-                           mode='lines')
-    return [scatter_s, scatter_i, scatter_r], group_counts
+    # the curves are downsampled to keep the figure small, the group counts are returned as they are
+    sim_conf = SimulationConfiguration.instance()
+    sorted_counts = group_counts.sort_values('simTime')
+    scatters = []
+    for column, name in [('group-s', 'susceptible '), ('group-i', 'infected '), ('group-r', 'recovered ')]:
+        x, y = sorted_counts['simTime'].values, sorted_counts[column].values
+        if sim_conf.PLOT_POINT_COUNT is not None:
+            # the extrema are kept so that e.g. the peak of the infected curve is not cut
+            x, y = lttb(x, y, sim_conf.PLOT_POINT_COUNT, keep_extrema=True)
+        scatters.append(go.Scatter(x=x,
+                                   y=y,
+                                   name=name + os.path.basename(folder),
+                                   mode='lines'))
+    return scatters, group_counts
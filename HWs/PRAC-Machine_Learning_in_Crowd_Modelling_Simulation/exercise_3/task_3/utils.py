@@ -2,6 +2,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 
+from common.integration import integrate
+
 
 def solve_euler(f_ode, y0, time):
     """
@@ -11,11 +13,7 @@ def solve_euler(f_ode, y0, time):
     :param time: np.array of time values (equally spaced), where the solution must be obtained.
     :returns: (solution[time,values], time) tuple.
     """
-    yt = np.zeros((len(time), len(y0)))
-    yt[0, :] = y0
-    step_size = time[1]-time[0]
-    for k in range(1, len(time)):
-        yt[k, :] = yt[k-1, :] + step_size * f_ode(yt[k-1, :])
+    yt = integrate(f_ode, y0, time, method='euler')
     return yt, time
 
 
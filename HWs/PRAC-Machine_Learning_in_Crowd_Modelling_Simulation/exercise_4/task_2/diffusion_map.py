@@ -1,4 +1,16 @@
+import warnings
+
 import numpy as np
+import scipy.sparse
+import scipy.sparse.linalg
+from scipy.spatial import cKDTree
+
+# number of nearest neighbours of each row in the sparse mode if neither n_neighbors nor cut_off is given
+DEFAULT_N_NEIGHBORS = 64
+# default maximum number of iterations of lobpcg, which usually needs a few hundred from a random start
+LOBPCG_MAX_ITER = 1000
+# default number of sampled rows estimating the kernel sums in sparse mode
+KERNEL_SUM_SAMPLES = 1000
 
 
 class DiffusionMap:
@@ -6,36 +18,102 @@ class DiffusionMap:
     Class representing the diffusion map algorithm
     """
 
-    def __init__(self, data, L):
+    def __init__(self, data, L, block_size=1024, sparse=False, n_neighbors=None, cut_off=None, epsilon=None,
+                 solver=None, initial_eigenvectors=None, tol=None, max_iter=None, dtype=np.float64, in_place=False,
+                 memmap_path=None):
         """
         Initiate attributes for the algorithm
 
         :param data: data itself
         :param L: number of eigenfunctions to be computed
+        :param block_size: number of rows processed at once while forming the distance and kernel matrices
+        :param sparse: if True, only the distances between neighbour rows are kept in scipy.sparse matrices and the
+            eigenfunctions are computed by scipy.sparse.linalg.eigsh. The memory usage is proportional to the number of
+            neighbour pairs, i.e. O(m * n_neighbors) for the nearest neighbour graph
+        :param n_neighbors: number of nearest rows that are the neighbours of a row in sparse mode (symmetrized, so a
+            row has at most 2 * n_neighbors neighbours), DEFAULT_N_NEIGHBORS if neither n_neighbors nor cut_off is given
+        :param cut_off: if given in sparse mode without n_neighbors, the rows within the cut-off distance are the
+            neighbours instead of the nearest rows. The kernel is taken as zero above it, so 3 * sqrt(epsilon) makes the
+            ignored entries at most exp(-9). Note that the number of neighbour pairs is m times the average number of
+            rows within the cut-off, which grows linearly in m for data on a fixed domain, i.e. the memory usage is
+            O(m^2) for a fixed cut-off
+        :param epsilon: if given, used instead of 5% of the diameter of the dataset, 'auto' to select it by
+            select_epsilon
+        :param solver: eigensolver of T_hat, one of
+            'eigh': full decomposition by np.linalg.eigh, O(m^3), default in dense mode
+            'eigsh': L+1 largest eigenpairs by the Lanczos method of scipy.sparse.linalg.eigsh, default in sparse mode
+            'lobpcg': L+1 largest eigenpairs by scipy.sparse.linalg.lobpcg, which iterates on a block of vectors and
+                hence benefits the most from a good initial guess
+        :param initial_eigenvectors: m x (L+1) array of approximate eigenvectors of T_hat (e.g. eigenvectors of a
+            previous run with another epsilon) to start the iterative solvers from
+        :param tol: tolerance of the iterative solvers. If None, machine precision for eigsh, and for lobpcg the square
+            root of the machine epsilon of T_hat (about 1.5e-8 in float64), a bound on the residual norms
+            ||T_hat * v - lambda * v|| of the eigenvectors, which are checked after the iterations
+        :param max_iter: maximum number of iterations of the iterative solvers, the default of eigsh and
+            LOBPCG_MAX_ITER for lobpcg if None. An error is raised if lobpcg does not converge within them
+        :param dtype: dtype of data and of the dense matrices, e.g. np.float32 to halve the memory usage. The distances
+            are computed in float64 block by block before being stored
+        :param in_place: if True, the dense D, W, K and T_hat are computed in a single m x m array, each overwriting
+            the previous one, which is dropped (set to None) as soon as it is no longer needed. The distances are then
+            recomputed by set_epsilon and get_kernel_sums
+        :param memmap_path: if given, the single m x m array of the in-place mode is a np.memmap backed by this file,
+            so that the dense matrices do not need to fit in RAM. Implies in_place, and should be used with the
+            iterative solvers, since eigh loads the whole matrix
 
         Attributes:
             m: corresponds to the number of rows of data (also named as N)
             n: corresponds to the number of columns of data
-            D: corresponds to the distance matrix
-            epsilon(ϵ): corresponds to 5% of the diameter of the dataset
-            W: corresponds to the kernel matrix
-            P: corresponds to the diagonal normalization matrix
-            K: corresponds to the *normalized* kernel matrix
-            Q: corresponds to the diagonal normalization matrix
-            processed_Q: corresponds to Q^(-1/2)
-            T_hat: corresponds to the symmetric matrix
+            D: corresponds to the distance matrix, sparse in sparse mode, None once overwritten in the in-place mode
+            diameter: corresponds to the diameter of the dataset (estimated in sparse mode)
+            tree: KD-tree of the rows in sparse mode, used to find the neighbours of new rows in transform
+            epsilon(ϵ): corresponds to 5% of the diameter of the dataset (estimated in sparse mode)
+            is_epsilon_auto: whether epsilon is selected by select_epsilon
+            W: corresponds to the kernel matrix, sparse in sparse mode, None once overwritten in the in-place mode
+            P: corresponds to the diagonal of the diagonal normalization matrix
+            K: corresponds to the *normalized* kernel matrix, sparse in sparse mode, None once overwritten in the
+                in-place mode
+            Q: corresponds to the diagonal of the diagonal normalization matrix
+            processed_Q: corresponds to the diagonal of Q^(-1/2)
+            T_hat: corresponds to the symmetric matrix, sparse in sparse mode
             L:
+            eigenvectors: m x (L+1) array storing the eigenvectors of T_hat as columns in descending order of
+                eigenvalues, used to warm start the iterative solvers when epsilon is changed
             largest_eigenfunctions: dictionary with the following form where index 0 stores the largest eigenvalue
                 {
                     index: (eigenvalue1, corresponding_eigenvector),
                     ...
                 }
         """
-        self.data = data
+        self.dtype = dtype
+        self.in_place = in_place or memmap_path is not None
+        self.memmap_path = memmap_path
+        self.data = np.asarray(data, dtype=dtype)
+        # the distances are computed in float64 from the data and its squared row norms, which are converted and
+        # computed once here (the copy is only made for other dtypes and is O(m * n), small next to the m x m matrices)
+        self._data64 = self.data.astype(np.float64, copy=False)
+        self._squared_norms = np.einsum('ij,ij->i', self._data64, self._data64)
+        self.block_size = block_size
+        self.sparse = sparse
+        if sparse and n_neighbors is None and cut_off is None:
+            n_neighbors = DEFAULT_N_NEIGHBORS
+        self.n_neighbors = n_neighbors
+        self.cut_off = cut_off
+        self.tree = None
+        if solver is None:
+            solver = 'eigsh' if sparse else 'eigh'
+        if solver not in ('eigh', 'eigsh', 'lobpcg'):
+            raise ValueError('Unknown eigensolver: {}'.format(solver))
+        if solver == 'eigh' and sparse:
+            raise ValueError('eigh solver requires the dense mode')
+        self.solver = solver
+        self.tol = tol
+        self.max_iter = max_iter
         self.m = data.shape[0]
         self.n = data.shape[1]
         self.D = None
-        self.epsilon = None
+        self.diameter = None
+        self.is_epsilon_auto = isinstance(epsilon, str) and epsilon == 'auto'
+        self.epsilon = None if self.is_epsilon_auto else epsilon
         self.W = None
         self.P = None
         self.K = None
@@ -43,85 +121,305 @@ class DiffusionMap:
         self.processed_Q = None
         self.T_hat = None
         self.L = L
+        self.eigenvectors = None if initial_eigenvectors is None else np.asarray(initial_eigenvectors, dtype=float)
         self.largest_eigenfunctions = dict()
         self.final_eigenvalues = None
         self.final_eigenvectors = None
         self._form_dist_matrix()  # initiate the process to form ambient kernel
 
+    def set_epsilon(self, epsilon):
+        """
+        Recomputes the diffusion map with another epsilon from the already computed distance matrix. The iterative
+        solvers are warm started from the eigenvectors of the current epsilon, which are close to the new ones if
+        epsilon changes slightly. In sparse mode the neighbour graph, hence the cut-off, is kept
+        :param epsilon: new epsilon
+        """
+        self.epsilon = epsilon
+        self.largest_eigenfunctions = dict()
+        if self.D is None:
+            # the distances are overwritten in the in-place mode
+            self._form_dense_dist_matrix()
+        self._form_kernel_matrix()
+
+    def get_kernel_sums(self, epsilons, n_samples=None):
+        """
+        Computes the sums of the kernel matrix entries, i.e. sum (exp(-D[i][j]^2 / epsilon) for all i, j), for several
+        epsilons. The distances of all pairs are needed, so they are taken from the dense distance matrix if it is
+        computed and otherwise recomputed block by block of rows (in sparse mode the neighbour graph misses the pairs
+        that dominate the sums of large epsilons)
+        :param epsilons: epsilons to compute the sums for
+        :param n_samples: if given, the sums are estimated from this many randomly sampled rows (against all rows)
+            times m / n_samples, which costs O(n_samples * m) instead of O(m^2). KERNEL_SUM_SAMPLES if None in sparse
+            mode
+        :return: array storing the kernel sum of each epsilon
+        """
+        epsilons = np.asarray(epsilons, dtype=float)
+        if n_samples is None and self.sparse:
+            n_samples = KERNEL_SUM_SAMPLES
+        if n_samples is None or n_samples >= self.m:
+            rows = np.arange(self.m)
+        else:
+            rows = np.sort(np.random.default_rng(0).choice(self.m, size=n_samples, replace=False))
+
+        kernel_sums = np.zeros(shape=len(epsilons))
+        for start in range(0, len(rows), self.block_size):
+            block_rows = rows[start:start + self.block_size]
+            if self.sparse or self.D is None:
+                squared_distances = self._compute_squared_distances(block_rows)
+            else:
+                squared_distances = np.square(self.D[block_rows], dtype=np.float64)
+            for ix, epsilon in enumerate(epsilons):
+                kernel_sums[ix] += np.exp(-squared_distances / epsilon).sum()
+        return kernel_sums * (self.m / len(rows))
+
+    def select_epsilon(self, epsilons=None):
+        """
+        Selects epsilon by the kernel sum criterion of Coifman et al. The kernel sum S(epsilon) goes from m (all
+        entries but the diagonal vanish) to m^2 (all entries are 1), and in between log S grows linearly in log epsilon
+        with slope d/2 for data on a d dimensional manifold. The selected epsilon is the one where log S is halfway
+        between log m and log m^2, i.e. in the middle of the linear region, interpolated between the candidates. The
+        epsilon of the largest slope is not used, since for compact manifolds it is at the end of the linear region
+        where the kernel starts to saturate. In sparse mode the sums are estimated by get_kernel_sums from a sample of
+        rows against all rows, not from the neighbour graph, whose sums cannot reach m^2
+        :param epsilons: candidate epsilons, powers of sqrt(2) from 2^-30 to 4 times the squared diameter of the
+            dataset if None. Epsilon divides the squared distances, so the candidates scale with the square of the
+            data, and they range from far below the squared distances of the nearest rows to above all squared distances
+        :return: selected epsilon
+        """
+        if epsilons is None:
+            epsilons = self.diameter ** 2 * 2 ** np.arange(-30, 2.5, .5)
+        epsilons = np.sort(np.asarray(epsilons, dtype=float))
+        log_kernel_sums = np.log(self.get_kernel_sums(epsilons))
+        target = 1.5 * np.log(self.m)
+        if not log_kernel_sums[0] <= target <= log_kernel_sums[-1]:
+            raise ValueError('The candidate epsilons from {:.3g} to {:.3g} do not bracket the kernel sum m^1.5, their '
+                             'log kernel sums are from {:.3g} to {:.3g} instead of around {:.3g}'
+                             .format(epsilons[0], epsilons[-1], log_kernel_sums[0], log_kernel_sums[-1], target))
+        return np.exp(np.interp(target, log_kernel_sums, np.log(epsilons)))
+
+    def sweep_epsilon(self, epsilons):
+        """
+        Computes the diffusion map for several epsilons from the already computed distance matrix, each warm started
+        from the previous one. The diffusion map is left computed with the last epsilon
+        :param epsilons: epsilons to compute the diffusion map for
+        :return: dictionary with the following form
+            {
+                epsilon: (final_eigenvalues, final_eigenvectors),
+                ...
+            }
+        """
+        spectra = dict()
+        for epsilon in epsilons:
+            self.set_epsilon(epsilon)
+            spectra[epsilon] = (self.final_eigenvalues, self.final_eigenvectors)
+        return spectra
+
+    def transform(self, new_data):
+        """
+        Embeds new rows by the Nystrom extension of the eigenfunctions, without changing the fitted diffusion map. The
+        kernel between the new rows and the rows of data is normalized with the stored P, epsilon and Q the same way as
+        W, and each eigenfunction at a new row is the average of its values at the rows of data weighted by the
+        normalized kernel, divided by the eigenvalue of T_hat. For the rows of data it gives final_eigenvectors
+        (approximately with n_neighbors, since the neighbour graph of data is symmetrized). The new rows are processed
+        block by block, so the cost is O(new rows x m) in dense mode and proportional to the number of neighbours in
+        sparse mode. In sparse mode the eigenfunctions at a new row without neighbours are nan
+        :param new_data: new rows with n columns
+        :return: (L+1) x (new rows) array storing the eigenfunctions at the new rows, in the order of final_eigenvectors
+        """
+        new_data = np.asarray(new_data, dtype=float)
+        eigenvalues = np.array([self.largest_eigenfunctions[ix][0] for ix in range(self.L + 1)])
+        eigenfunctions = self.final_eigenvectors.T / eigenvalues[None, :]
+        P_inverse = 1 / self.P
+
+        new_eigenfunctions = np.empty(shape=(self.L + 1, new_data.shape[0]))
+        for start in range(0, new_data.shape[0], self.block_size):
+            end = min(start + self.block_size, new_data.shape[0])
+            new_W = self._form_new_kernel_matrix(new_data[start:end])
+            # normalize the kernel as K = P^-1 * W * P^-1, then the rows as T = Q^-1 * K
+            new_P = np.asarray(new_W.sum(axis=1)).ravel()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if self.sparse:
+                    new_K = scipy.sparse.diags(1 / new_P) @ new_W @ scipy.sparse.diags(P_inverse)
+                    new_Q = np.asarray(new_K.sum(axis=1)).ravel()
+                    new_eigenfunctions[:, start:end] = (new_K @ eigenfunctions).T / new_Q[None, :]
+                else:
+                    new_W *= P_inverse[None, :]
+                    new_W /= new_P[:, None]
+                    new_Q = new_W.sum(axis=1)
+                    new_eigenfunctions[:, start:end] = (new_W @ eigenfunctions).T / new_Q[None, :]
+        return new_eigenfunctions
+
+    def _form_new_kernel_matrix(self, new_data):
+        """
+        Forms the kernel matrix between new rows and the rows of data, i.e. W[i][j] = exp(-||new_i - x_j||^2 / epsilon)
+        :param new_data: new rows with n columns
+        :return: (new rows) x m kernel matrix, sparse in sparse mode
+        """
+        if self.sparse:
+            if self.n_neighbors is None:
+                new_W = cKDTree(new_data).sparse_distance_matrix(self.tree, self.cut_off, output_type='coo_matrix')
+                new_W = new_W.tocsr()
+            else:
+                distances, neighbors = self.tree.query(new_data, k=self.n_neighbors)
+                rows = np.repeat(np.arange(new_data.shape[0]), self.n_neighbors)
+                new_W = scipy.sparse.csr_matrix((distances.ravel(), (rows, neighbors.ravel())),
+                                                shape=(new_data.shape[0], self.m))
+            new_W.data = np.exp(-np.square(new_W.data) / self.epsilon)
+            return new_W
+
+        new_W = new_data @ self._data64.T
+        new_W *= -2
+        new_W += np.einsum('ij,ij->i', new_data, new_data)[:, None]
+        new_W += self._squared_norms[None, :]
+        np.maximum(new_W, 0, out=new_W)
+        new_W /= -self.epsilon
+        np.exp(new_W, out=new_W)
+        return new_W
+
     def _form_dist_matrix(self):
         """
         Forms a distance matrix with the metric of Euclidean distance between rows
         """
+        if self.sparse:
+            self._form_sparse_dist_matrix()
+        else:
+            self._form_dense_dist_matrix()
+        if self.is_epsilon_auto:
+            self.epsilon = self.select_epsilon()
+        self._form_kernel_matrix()
 
-        # initiate distance matrix with zeros
-        self.D = np.zeros(shape=(self.m, self.m))
+    def _form_dense_dist_matrix(self):
+        """
+        Forms the dense distance matrix block by block of rows, so that the temporary arrays stay small
+        """
 
-        def calculate_distance(row_i, row_j):
-            """
-            An inner method to calculate the Euclidean distance between two rows
-            :param row_i: np array with n entries
-            :param row_j: np array with n entries
-            :return: distance between two rows
-            """
-            total_dist = np.sum([(row_i[ix] - row_j[ix]) ** 2 for ix in range(self.n)])
-            return np.sqrt(total_dist)
+        self.D = self._allocate_matrix()
+        self.diameter = 0
+        for start in range(0, self.m, self.block_size):
+            end = min(start + self.block_size, self.m)
+            block = self._compute_squared_distances(np.arange(start, end))
+            np.sqrt(block, out=block)
+            self.D[start:end] = block
+            self.diameter = max(self.diameter, block.max())
 
-        max_distance = 0
-        for i in range(self.m):
-            for j in range(self.m):
-                self.D[i][j] = calculate_distance(self.data[i], self.data[j])
-                max_distance = max(self.D[i][j], max_distance)
+        if self.epsilon is None:
+            self.epsilon = .05 * self.diameter
 
-        self.epsilon = .05 * max_distance
-        self._form_kernel_matrix()
+    def _compute_squared_distances(self, rows):
+        """
+        Computes the squared distances between a block of rows and all rows in float64 by the identity
+        ||x_i - x_j||^2 = ||x_i||^2 + ||x_j||^2 - 2 * <x_i, x_j>
+        :param rows: indices of the rows of the block
+        :return: len(rows) x m array of the squared distances
+        """
+        block = self._data64[rows] @ self._data64.T
+        block *= -2
+        block += self._squared_norms[rows, None]
+        block += self._squared_norms[None, :]
+        # rounding errors might make the squared distances of close rows slightly negative
+        np.maximum(block, 0, out=block)
+        block[np.arange(len(rows)), rows] = 0
+        return block
+
+    def _allocate_matrix(self):
+        """
+        Allocates a dense m x m matrix. In the in-place mode the array of the previous T_hat is reused, and it is
+        backed by the memmap file if memmap_path is given
+        :return: uninitialized m x m array of dtype
+        """
+        if self.in_place and self.T_hat is not None:
+            matrix, self.T_hat = self.T_hat, None
+            return matrix
+        if self.memmap_path is not None:
+            return np.memmap(self.memmap_path, dtype=self.dtype, mode='w+', shape=(self.m, self.m))
+        return np.empty(shape=(self.m, self.m), dtype=self.dtype)
+
+    def _form_sparse_dist_matrix(self):
+        """
+        Forms the sparse distance matrix storing the distances between the neighbour rows found by a KD-tree. The
+        diameter of the dataset is estimated by a double sweep (the farthest row from the farthest row of an arbitrary
+        row), which is at least half of the diameter and usually very close to it
+        """
+        self.tree = cKDTree(self.data)
+        tree = self.tree
+        farthest = np.argmax(np.linalg.norm(self.data - self.data[0], axis=1))
+        self.diameter = np.linalg.norm(self.data - self.data[farthest], axis=1).max()
+        if self.epsilon is None:
+            self.epsilon = .05 * self.diameter
+
+        if self.n_neighbors is None:
+            pairs = tree.query_pairs(self.cut_off, output_type='ndarray')
+            rows, cols = pairs[:, 0], pairs[:, 1]
+            distances = np.linalg.norm(self.data[rows] - self.data[cols], axis=1)
+        else:
+            # a row is usually its own first neighbour, but a duplicate of it might come first (or the row might be
+            # missing among the duplicates), so the row itself is dropped wherever it is and the nearest n_neighbors
+            # other rows are kept
+            distances, neighbors = tree.query(self.data, k=self.n_neighbors + 1)
+            is_other = neighbors != np.arange(self.m)[:, None]
+            ids = np.argsort(~is_other, axis=1, kind='stable')[:, :self.n_neighbors]
+            rows = np.repeat(np.arange(self.m), self.n_neighbors)
+            cols = np.take_along_axis(neighbors, ids, axis=1).ravel()
+            distances = np.take_along_axis(distances, ids, axis=1).ravel()
+            # keep each pair once, so that the neighbour relation is symmetrized
+            is_first = rows < cols
+            rows, cols = np.where(is_first, rows, cols), np.where(is_first, cols, rows)
+            _, unique_ids = np.unique(rows * self.m + cols, return_index=True)
+            rows, cols, distances = rows[unique_ids], cols[unique_ids], distances[unique_ids]
+
+        self.D = scipy.sparse.coo_matrix((np.concatenate([distances, distances]),
+                                          (np.concatenate([rows, cols]), np.concatenate([cols, rows]))),
+                                         shape=(self.m, self.m)).tocsr()
 
     def _form_kernel_matrix(self):
         """
-        Forms the kernel matrix W
+        Forms the kernel matrix W, i.e. W[i][j] = exp(-D[i][j]^2 / epsilon)
         """
-        # initiate kernel matrix with zeros
-        self.W = np.zeros(shape=(self.m, self.m))
-
-        for i in range(self.m):
-            for j in range(self.m):
-                self.W[i][j] = np.exp(-(self.D[i][j] ** 2) / self.epsilon)
+        if self.sparse:
+            # the kernel of a row with itself is 1, it is not stored in the distance matrix since the distance is 0
+            self.W = self.D.copy()
+            self.W.data = np.exp(-np.square(self.W.data) / self.epsilon)
+            self.W = (self.W + scipy.sparse.identity(self.m, format='csr')).tocsr()
+        else:
+            self.W = self.D if self.in_place else self._allocate_matrix()
+            for start in range(0, self.m, self.block_size):
+                end = min(start + self.block_size, self.m)
+                block = self.W[start:end]
+                np.square(self.D[start:end], out=block)
+                block /= -self.epsilon
+                np.exp(block, out=block)
+            if self.in_place:
+                self.D = None
 
         self._form_diagonal_normalization_matrix()
 
     def _form_diagonal_normalization_matrix(self):
         """
-        Forms the diagonal normalization matrix P
+        Forms the diagonal normalization matrix P, stored as the vector of its diagonal, i.e. P[i] = sum (W[i][j] for
+        all j)
         """
-
-        # initiate diagonal normalization matrix with zeros
-        self.P = np.zeros(shape=(self.m, self.m))
-
-        for i in range(self.m):
-            # for each row, sum up all values within that row
-            self.P[i][i] = sum([self.W[i][j] for j in range(self.m)])
+        self.P = self._sum_rows(self.W)
 
         self._normalize_kernel_matrix()
 
     def _normalize_kernel_matrix(self):
         """
-        Forms the normalized the kernel matrix, i.e. K = P^-1 * W * P^-1
+        Forms the normalized the kernel matrix, i.e. K = P^-1 * W * P^-1. Since P is diagonal, it is the same as dividing
+        each entry W[i][j] by P[i] * P[j]
         """
-        P_inverse = np.linalg.inv(self.P)
-        self.K = P_inverse @ self.W @ P_inverse
+        P_inverse = 1 / self.P
+        self.K = self._scale_rows_and_cols(self.W, P_inverse)
+        if self.in_place:
+            self.W = None
 
         self._form_diagonal_normalization_matrix_q()
 
     def _form_diagonal_normalization_matrix_q(self):
         """
-        Forms the diagonal normalization matrix Q, i.e. Q[i][i] = sum (K[i][j] for all j)
+        Forms the diagonal normalization matrix Q, stored as the vector of its diagonal, i.e. Q[i] = sum (K[i][j] for
+        all j)
         """
-
-        # initiate matrix with zeros
-        self.Q = np.zeros(shape=(self.m, self.m))
-
-        for i in range(self.m):
-            # for each row, sum up all values within that row
-            self.Q[i][i] = sum([self.K[i][j] for j in range(self.m)])
+        self.Q = self._sum_rows(self.K)
 
         self._form_symmetric_matrix()
 
@@ -130,27 +428,88 @@ class DiffusionMap:
         Forms the symmetric matrix T_hat, i.e. T_hat = Q^(-1/2) * K * Q^(-1/2)
         """
 
-        processed_Q = np.zeros(shape=(self.m, self.m))
-
-        for i in range(self.m):
-            if self.Q[i][i] != 0:
-                processed_Q[i][i] = 1 / np.sqrt(self.Q[i][i])
+        processed_Q = np.zeros(shape=self.m)
+        is_nonzero = self.Q != 0
+        processed_Q[is_nonzero] = 1 / np.sqrt(self.Q[is_nonzero])
 
         self.processed_Q = processed_Q
-        self.T_hat = processed_Q @ self.K @ processed_Q
+        self.T_hat = self._scale_rows_and_cols(self.K, processed_Q)
+        if self.in_place:
+            self.K = None
 
         self._find_largest_eigenfunctions()
 
+    def _scale_rows_and_cols(self, matrix, scales):
+        """
+        Multiplies the matrix from both sides by the diagonal matrix with the given diagonal
+        :param matrix: dense or sparse m x m matrix
+        :param scales: diagonal of the diagonal matrix
+        :return: scaled matrix of the same kind, the same array in the in-place mode
+        """
+        if self.sparse:
+            diagonal = scipy.sparse.diags(scales)
+            return (diagonal @ matrix @ diagonal).tocsr()
+        scaled_matrix = matrix if self.in_place else self._allocate_matrix()
+        for start in range(0, self.m, self.block_size):
+            end = min(start + self.block_size, self.m)
+            block = scaled_matrix[start:end]
+            np.multiply(matrix[start:end], scales[start:end, None], out=block, casting='unsafe')
+            np.multiply(block, scales[None, :], out=block, casting='unsafe')
+        return scaled_matrix
+
+    def _sum_rows(self, matrix):
+        """
+        Sums the rows of the matrix in float64, block by block of rows in dense mode
+        :param matrix: dense or sparse m x m matrix
+        :return: vector of the row sums
+        """
+        if self.sparse:
+            return np.asarray(matrix.sum(axis=1, dtype=np.float64)).ravel()
+        row_sums = np.empty(shape=self.m)
+        for start in range(0, self.m, self.block_size):
+            end = min(start + self.block_size, self.m)
+            row_sums[start:end] = matrix[start:end].sum(axis=1, dtype=np.float64)
+        return row_sums
+
     def _find_largest_eigenfunctions(self):
         """
         Find the L+1 largest eigenvalues and associated eigenvectors of T_hat
         """
 
-        eigenvalues, eigenvectors = np.linalg.eigh(self.T_hat)
+        k = self.L + 1
+        if self.solver == 'eigh':
+            eigenvalues, eigenvectors = np.linalg.eigh(self.T_hat)
+            eigenvalues, eigenvectors = eigenvalues[-k:], eigenvectors[:, -k:]
+        elif self.solver == 'eigsh':
+            # eigsh starts from a single vector, the sum of the previous eigenvectors has components along all of them
+            v0 = None if self.eigenvectors is None else self.eigenvectors.sum(axis=1)
+            eigenvalues, eigenvectors = scipy.sparse.linalg.eigsh(self.T_hat, k=k, which='LA', v0=v0,
+                                                                  tol=0 if self.tol is None else self.tol,
+                                                                  maxiter=self.max_iter)
+        else:
+            if self.eigenvectors is None:
+                initial_eigenvectors = np.random.default_rng(0).standard_normal(size=(self.m, k))
+            else:
+                initial_eigenvectors = self.eigenvectors
+            max_iter = LOBPCG_MAX_ITER if self.max_iter is None else self.max_iter
+            tol = np.sqrt(np.finfo(self.T_hat.dtype).eps) if self.tol is None else self.tol
+            with warnings.catch_warnings():
+                # the convergence is checked below, lobpcg only warns and returns the last iterate
+                warnings.simplefilter('ignore', UserWarning)
+                eigenvalues, eigenvectors = scipy.sparse.linalg.lobpcg(self.T_hat, initial_eigenvectors, largest=True,
+                                                                       tol=tol, maxiter=max_iter)
+            residual_norms = np.linalg.norm(self.T_hat @ eigenvectors - eigenvectors * eigenvalues[None, :], axis=0)
+            if residual_norms.max() > tol:
+                raise np.linalg.LinAlgError('lobpcg did not converge in {} iterations: largest residual norm {:.3g} > '
+                                            'tol {:.3g}'.format(max_iter, residual_norms.max(), tol))
+        # iterative solvers do not sort the eigenpairs
+        order = np.argsort(eigenvalues)
+        eigenvalues, eigenvectors = eigenvalues[order], eigenvectors[:, order]
+        self.eigenvectors = eigenvectors[:, ::-1]
 
         count = self.L
-        # iterate through the largest L+1
-        for eigval, eigvec in zip(eigenvalues[-(self.L + 1):], eigenvectors[-(self.L + 1):]):
+        # iterate through the largest L+1, the eigenvectors are the columns
+        for eigval, eigvec in zip(eigenvalues, eigenvectors.T):
             self.largest_eigenfunctions.update({count: (eigval, eigvec)})
             count -= 1
 
@@ -180,4 +539,4 @@ class DiffusionMap:
 
         for ix in range(self.L + 1):
             _, eigenvector = self.largest_eigenfunctions[ix]
-            self.final_eigenvectors[ix] = self.processed_Q @ eigenvector
+            self.final_eigenvectors[ix] = self.processed_Q * eigenvector
@@ -1,6 +1,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
 
+from common.rbf import get_rbf_basis, evaluate_rbf
 from solver import Solver
 
 
@@ -64,14 +65,7 @@ class NonlinearSolver(Solver):
         """
         plt.scatter(x, y, color='b')
         x_sample = np.linspace(x_left, x_right, n_points)
-        y_sample = []
-        for x_val in x_sample:
-            sum = 0
-            for k in range(self.L):
-                x_prime = np.exp(-((x_l[k] - x_val) ** 2) / (self.eps ** 2))
-                sum += x_prime * coef[k]
-            y_sample.append(sum)
-        y_sample = np.asarray(y_sample)
+        y_sample = evaluate_rbf(x_sample, x_l, self.eps, coef[:self.L])
         plt.plot(x_sample, y_sample, color='r', linestyle='solid')
         plt.show()
 
@@ -87,14 +81,7 @@ class NonlinearSolver(Solver):
         """
         plt.scatter(x, y, color='b')
         x_sample = np.linspace(np.min(x) - expand, np.max(x) + expand, n_points)
-        y_sample = []
-        for x_val in x_sample:
-            sum = 0
-            for k in range(self.L):
-                x_prime = np.exp(-((x_l[k] - x_val) ** 2) / (self.eps ** 2))
-                sum += x_prime * coef[k]
-            y_sample.append(sum)
-        y_sample = np.asarray(y_sample)
+        y_sample = evaluate_rbf(x_sample, x_l, self.eps, coef[:self.L])
         plt.plot(x_sample, y_sample, color='r', linestyle='solid')
         plt.show()
 
@@ -106,10 +93,7 @@ class NonlinearSolver(Solver):
         :returns:         The radial function values and chosen center points
         """
         x_l = np.linspace(np.min(x) - expand, np.max(x) + expand, self.L)
-        x_basis = np.empty([self.n, self.L], dtype=np.float64)
-        for i in range(self.n):
-            for k in range(self.L):
-                x_basis[i, k] = np.exp(-((x_l[k] - x[i]) ** 2) / (self.eps ** 2))
+        x_basis = get_rbf_basis(x, x_l, self.eps)
         return x_basis, x_l
 
     def solve_nonlinear(self):
@@ -1,5 +1,6 @@
 import numpy as np
 
+from common.rbf import get_rbf_basis, get_farthest_point_centers, get_kmeans_centers
 from solver import Solver
 
 
@@ -9,13 +10,15 @@ class NonlinearSolver(Solver):
     Attributes:
         L:              The number of radial functions
         eps:            The epsilon value given in the calculation of radial functions
+        center_method:  The method choosing the center points, one of kmeans, farthest_point and random
+        rng:            The random number generator choosing the center points
         file_name_x0:   Input file storing coordinates of the first points of trajectories
         file_name_x1:   Input file storing coordinates of the second points of trajectories
         folder_path:    Directory of the folder where input files are stored
         n:              The number of points in the dataset
     """
 
-    def __init__(self, L, eps, file_name_x0, file_name_x1, folder_path=None):
+    def __init__(self, L, eps, file_name_x0, file_name_x1, folder_path=None, center_method='kmeans', seed=None):
         """
         Initializer of the class NonlinearSolver
         L:              The number of radial functions
@@ -23,10 +26,17 @@ class NonlinearSolver(Solver):
         file_name_x0:   Input file storing coordinates of the first points of trajectories
         file_name_x1:   Input file storing coordinates of the second points of trajectories
         folder_path:    Directory of the folder where input files are stored
+        center_method:  The method choosing the center points, one of kmeans, farthest_point and random (uniform in
+                        the bounding box of the points)
+        seed:           The seed of the random number generator choosing the center points
         """
         super().__init__(file_name_x0, file_name_x1, folder_path)
+        if center_method not in ('kmeans', 'farthest_point', 'random'):
+            raise ValueError('Unknown center method: {}'.format(center_method))
         self.L = L
         self.eps = eps
+        self.center_method = center_method
+        self.rng = np.random.default_rng(seed)
 
     @staticmethod
     def get_nonlinear_pred(x_0, A, coef, delta_t):
@@ -43,21 +53,26 @@ class NonlinearSolver(Solver):
         pred_x_1 = x_0 + displacement
         return pred_x_1
 
+    def get_centers(self, x):
+        """
+        Chooses the center points of the radial functions
+        :param x:     The coordinates of the points
+        :returns:     The center points of shape (L, d)
+        """
+        if self.center_method == 'kmeans':
+            return get_kmeans_centers(x, self.L, self.rng)
+        if self.center_method == 'farthest_point':
+            return get_farthest_point_centers(x, self.L, self.rng)
+        return self.rng.uniform(np.min(x, axis=0), np.max(x, axis=0), size=(self.L, x.shape[1]))
+
     def get_basis(self, x):
         """
-        Calculates radial function values of the given points
+        Calculates radial function values exp(-||x_l - x||^2 / eps^2) of the given points, one for each center point
         :param x:     The coordinates of the points
         :returns:     The radial function values and chosen center points
         """
-        x_l = 9*np.random.rand(self.L,2)-4.5
-        x_basis = np.empty([self.n, self.L*2], dtype=np.float64)
-        for i in range(self.n):
-            x_i = x[i,:]
-            x_i_basis = x_l - x_i[:,None].T
-            x_i_basis = x_i_basis**2
-            x_i_basis = -x_i_basis / (self.eps**2)
-            x_i_basis = np.exp(x_i_basis)
-            x_basis[i,:] = np.ravel(x_i_basis)
+        x_l = self.get_centers(x)
+        x_basis = get_rbf_basis(x, x_l, self.eps)
         return x_basis, x_l
 
     def solve_nonlinear(self, delta_t = 0.1):
@@ -38,11 +38,7 @@ class Solver:
         with open(file_path) as f:
             lines = f.readlines()
             for line in lines:
-                row_data = []
-                x,y = map (float,line.split())
-                row_data.append(x)
-                row_data.append(y)
-                row_data = np.asarray(row_data)
+                row_data = np.asarray(list(map(float, line.split())))
                 data.append(row_data)
         data = np.asarray(data)
         self.n = data.shape[0]
@@ -2,6 +2,9 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 
+from common.integration import integrate
+from common.rbf import get_rbf_basis
+
 
 class Trajectory:
     """
@@ -48,24 +51,37 @@ class Trajectory:
         :param time:    np.array of time values (equally spaced), where the solution must be obtained.
         :returns:       All points in the trajectory by order and pair of close points
         """
+        yts, close_points = self.solve_batch(y0[None, :], time)
+        return yts[:, 0, :], close_points
+
+    def get_velocity(self, x):
+        """
+        Calculates the velocities at the given points using radial functions
+        :param x:   The coordinates of the points, one per row
+        :returns:   The velocities at the points
+        """
+        x_basis = get_rbf_basis(x, self.x_l, self.eps)
+        return np.dot(x_basis, self.coef[:-1])
+
+    def solve_batch(self, y0s, time, method='euler', **options):
+        """
+        Solves the given ODE system using radial functions for all initial conditions together. The radial function
+        values and the velocities of all trajectories are calculated at once in each step
+        :param y0s:         the initial conditions to start the solutions at, one per row.
+        :param time:        np.array of time values, where the solutions must be obtained.
+        :param method:      the integration method, see common.integration.integrate
+        :param options:     options of the integration method
+        :returns:           All points in the trajectories by order of shape (len(time), n, d) and pair of close
+                            points ordered by initial condition and then by time
+        """
+        yts = integrate(self.get_velocity, y0s, time, method=method, **options)
+        euc_dists = np.sqrt(np.sum(np.diff(yts, axis=0) ** 2, axis=2))
+
         close_points = []
-        yt = np.zeros((len(time), len(y0)))
-        yt[0, :] = y0
-        step_size = time[1] - time[0]
-        for i in range(1, len(time)):
-            x = yt[i - 1, :]
-            x_basis = np.empty([self.L * 2], dtype=np.float64)
-            x_basis = self.x_l - x[:, None].T
-            x_basis = x_basis ** 2
-            x_basis = -x_basis / (self.eps ** 2)
-            x_basis = np.exp(x_basis)
-            x_basis = np.ravel(x_basis)
-            pred_v = np.dot(x_basis, self.coef[:-1])
-            yt[i, :] = yt[i - 1, :] + step_size * pred_v
-            euc_dist = self.get_euc_dist(yt[i - 1, :], yt[i, :])
-            if euc_dist < 1e-7:
-                close_points.append((yt[i - 1, :], yt[i, :], euc_dist))
-        return yt, close_points
+        point_ids, steps = np.nonzero(euc_dists.T < 1e-7)
+        for point_id, step in zip(point_ids, steps):
+            close_points.append((yts[step, point_id], yts[step + 1, point_id], euc_dists[step, point_id]))
+        return yts, close_points
 
     @staticmethod
     def plot_phase_portrait():
@@ -82,27 +98,20 @@ class Trajectory:
     def plot_trajectory(self, periodic_print=True):
         """
         Plots trajectories for the given inital points
-        :param periodic_print:  A debugging boolean value to see if plotting works fast
+        :param periodic_print:  A debugging boolean value to print the number of initial points once, before all of
+                                them are integrated together
         :returns:               All pair of close points
         """
-        n = self.x_0.shape[0]
         w = 4.5
         Y, X = np.mgrid[-w:w:100j, -w:w:100j]
 
         ax0 = self.plot_phase_portrait()
 
-        period = 100
-        yts = []
-        close_points = []
-        for i in range(n):
-            if periodic_print and i % period == 0:
-                print("Plotting for initial point:", i)
-            y0 = self.x_0[i, :]
-            time = np.linspace(0, 100, 1000)
-            yt, new_close_points = self.solve_euler(y0, time)
-            close_points.extend(new_close_points)
-            yts.append(yt)
-            ax0.plot(yt[:, 0], yt[:, 1], c='red')
+        if periodic_print:
+            print("Plotting for initial points:", self.x_0.shape[0])
+        time = np.linspace(0, 100, 1000)
+        yts, close_points = self.solve_batch(self.x_0, time)
+        ax0.plot(yts[:, :, 0], yts[:, :, 1], c='red')
 
         ax0.set_aspect(1)
 
@@ -2,48 +2,143 @@ import numpy as np
 from utils import lorenz
 from matplotlib import pyplot as plt
 
+from common.integration import FIXED_STEP_METHODS, integrate
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
 # Need one more for the initial values
 dt = 0.001
 TIME_LIMIT = 1000
 
-def get_trajectory(x_0=10., r=28.0, plot=False):
+# parameters s and b of the Lorenz system, the defaults of utils.lorenz
+S, _, B = lorenz.__defaults__
+# number of steps of size dt integrated at once by the fixed step methods when only every k-th point is recorded
+BLOCK_STEPS = 10000
+
+
+def get_n_steps():
+    """
+    Returns:
+       n_steps: number of Euler steps of size dt taken while the time is smaller than TIME_LIMIT
+    """
+    n_steps = int(np.ceil(TIME_LIMIT / dt))
+    # correct the rounding of the division, so that the count is the same as stepping through time
+    while n_steps * dt < TIME_LIMIT:
+        n_steps += 1
+    while n_steps > 0 and (n_steps - 1) * dt >= TIME_LIMIT:
+        n_steps -= 1
+    return n_steps
+
+
+def _euler_steps(trajectory, x, y, z, r, step_size, n_steps, record_every):
+    """
+    Given:
+       trajectory: array of shape (n_steps // record_every + 1, 3) to write the points into, the first row is set
+       x, y, z: initial point of the trajectory
+       r: parameter rho of Lorenz system
+       step_size: size of the Euler steps
+       n_steps: number of Euler steps
+       record_every: only every record_every-th point is written
+    """
+    for step in range(1, n_steps + 1):
+        change_x, change_y, change_z = _lorenz_kernel(x, y, z, S, r, B)
+        x += change_x * step_size
+        y += change_y * step_size
+        z += change_z * step_size
+        if step % record_every == 0:
+            row = step // record_every
+            trajectory[row, 0] = x
+            trajectory[row, 1] = y
+            trajectory[row, 2] = z
+
+
+# the Euler steps are compiled by numba if it is installed, otherwise they run as a Python loop on floats
+if numba is not None:
+    _lorenz_kernel = numba.njit(lorenz)
+    _euler_steps_jit = numba.njit(_euler_steps)
+else:
+    _lorenz_kernel = lorenz
+    _euler_steps_jit = None
+
+
+def get_trajectory(x_0=10., r=28.0, plot=False, method='euler', record_every=1, out=None, use_numba=True,
+                   **options):
     """
     Given:
        x_0: initial point of the trajectory
        r: parameter rho of Lorenz system
        plot: flag to plot the trajectory
+       method: 'euler' for forward Euler steps of size dt, or an integration method of common.integration.integrate
+           evaluated at the same time values, e.g. 'rk45' taking far fewer adaptive steps with a smaller error
+       record_every: integer of at least 1, only every record_every-th point of the trajectory is kept, i.e. the
+           points are dt * record_every apart in time. The steps are still of size dt for the fixed step methods, and
+           rk45 chooses its steps independently of the recorded time values
+       out: preallocated float64 array of shape (get_n_steps() // record_every + 1, 3) to write the points into
+       use_numba: flag to run the Euler steps compiled by numba if it is installed
+       options: options of the integration method, e.g. rtol and atol of 'rk45'
     Returns:
        x: points of trajectory for the given initial point and parameters - axis x
        y: points of trajectory for the given initial point and parameters - axis y
        z: points of trajectory for the given initial point and parameters - axis z
+       (the columns of the (steps, 3) trajectory array)
     """
+    if isinstance(record_every, bool) or not isinstance(record_every, (int, np.integer)) or record_every < 1:
+        raise ValueError('record_every must be an integer of at least 1, got {!r}'.format(record_every))
+    record_every = int(record_every)
+    n_steps = get_n_steps()
+    n_records = n_steps // record_every + 1
+    if out is None:
+        out = np.empty((n_records, 3), dtype=np.float64)
+    elif out.shape != (n_records, 3):
+        raise ValueError('The output array must have the shape {}'.format((n_records, 3)))
+    initial_point = np.array([x_0, 10., 10.])
+
+    if method != 'euler':
+        def f_ode(point):
+            return np.stack(lorenz(x=point[..., 0], y=point[..., 1], z=point[..., 2], r=r), axis=-1)
 
-    # Set initial values
-    curr_x, curr_y, curr_z = (x_0, 10., 10.)
-    x = [curr_x]
-    y = [curr_y]
-    z = [curr_z]
-    curr_idx = 0
-
-    # Step through "time", calculating the partial derivatives at the current point
-    # and using them to estimate the next point
-    while curr_idx * dt < TIME_LIMIT:
-        change_x, change_y, change_z = lorenz(x=curr_x, y=curr_y, z=curr_z, r=r)
-        curr_x += change_x * dt
-        curr_y += change_y * dt
-        curr_z += change_z * dt
-        x.append(curr_x)
-        y.append(curr_y)
-        z.append(curr_z)
-        curr_idx += 1
+        if method in FIXED_STEP_METHODS and record_every > 1:
+            # the fixed step methods step between the given time values, so the dt steps are integrated block by
+            # block from the last recorded point and every record_every-th point of a block is kept
+            block_records = max(BLOCK_STEPS // record_every, 1)
+            block = np.empty((block_records * record_every + 1, 3), dtype=np.float64)
+            out[0] = initial_point
+            for start in range(0, n_records - 1, block_records):
+                n_block_records = min(block_records, n_records - 1 - start)
+                n_block_steps = n_block_records * record_every
+                # the same time values as the full grid, so that the steps are the same up to the last bit
+                time = np.arange(start * record_every, start * record_every + n_block_steps + 1) * dt
+                integrate(f_ode, out[start], time, method=method, out=block[:n_block_steps + 1], **options)
+                out[start + 1:start + 1 + n_block_records] = block[record_every:n_block_steps + 1:record_every]
+        else:
+            time = np.arange(n_records) * (dt * record_every)
+            integrate(f_ode, initial_point, time, method=method, out=out, **options)
+    else:
+        # Step through "time", calculating the partial derivatives at the current point
+        # and using them to estimate the next point
+        out[0] = initial_point
+        euler_steps = _euler_steps_jit if use_numba and _euler_steps_jit is not None else _euler_steps
+        euler_steps(out, float(x_0), 10., 10., float(r), dt, n_steps, record_every)
 
+    x, y, z = out.T
     # plot trajectory for the given initial point and params
     if plot:
-        ax = plt.figure(figsize=(8,6)).add_subplot(projection='3d')
-        ax.plot(x, y, z, lw=0.6)
-        ax.set_xlabel("X Axis")
-        ax.set_ylabel("Y Axis")
-        ax.set_zlabel("Z Axis")
-        ax.set_title("Lorenz Attractor")
+        plot_trajectory(x, y, z)
 
     return x, y, z
+
+
+def plot_trajectory(x, y, z):
+    """
+    Given:
+       x, y, z: points of trajectory - axes x, y and z
+    """
+    ax = plt.figure(figsize=(8,6)).add_subplot(projection='3d')
+    ax.plot(x, y, z, lw=0.6)
+    ax.set_xlabel("X Axis")
+    ax.set_ylabel("Y Axis")
+    ax.set_zlabel("Z Axis")
+    ax.set_title("Lorenz Attractor")